@@ -1,3 +1,4 @@
+import logging
 import random
 random.seed(42)
 
@@ -12,4 +13,6 @@ if __name__ == "__main__":
             'LOGINFO': 'This Log file serves as an error debug basis for this application'
         }
     )
+    # Run statistics of the predictions (cache hit rates, solver convergence)
+    logging.getLogger('prediction_worker').setLevel('INFO')
     run_webserver()
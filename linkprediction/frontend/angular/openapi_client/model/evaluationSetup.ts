@@ -17,5 +17,17 @@ export interface EvaluationSetup {
     train_sampling_ratio: number;
     test_sampling_ratio?: number;
     ml_preprocessing: boolean;
+    worker_processes?: number;
+    candidate_strategy?: EvaluationSetup.CandidateStrategyEnum;
+    negative_ratio?: number;
+    candidate_max_distance?: number;
+    skip_visualization?: boolean;
+}
+export namespace EvaluationSetup {
+    export type CandidateStrategyEnum = 'all' | 'negative_sampling' | 'distance';
+    export const CandidateStrategyEnum = {
+        All: 'all' as CandidateStrategyEnum,
+        NegativeSampling: 'negative_sampling' as CandidateStrategyEnum,
+        Distance: 'distance' as CandidateStrategyEnum
+    };
 }
-
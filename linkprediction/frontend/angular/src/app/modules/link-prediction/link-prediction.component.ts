@@ -96,6 +96,10 @@ export class LinkPredictionComponent implements OnInit {
     this.evaluationSetup.with_validation = !this.evaluationSetup.with_validation;
   }
 
+  onSkipVisualizationActivate() {
+    this.evaluationSetup.skip_visualization = !this.evaluationSetup.skip_visualization;
+  }
+
   parametersAvailable(predictor: Predictor) {
     if (this.parametersAvailableFlag(predictor)) {
       return "Available";
@@ -39,7 +39,12 @@ export class PredictionSettingsService {
           "with_validation": result.results['with_validation'],
           "train_sampling_ratio": result.results['train_sampling_ratio'],
           "test_sampling_ratio": result.results['test_sampling_ratio'],
-          "ml_preprocessing": result.results['ml_preprocessing']
+          "ml_preprocessing": result.results['ml_preprocessing'],
+          "worker_processes": result.results['worker_processes'],
+          "candidate_strategy": result.results['candidate_strategy'],
+          "negative_ratio": result.results['negative_ratio'],
+          "candidate_max_distance": result.results['candidate_max_distance'],
+          "skip_visualization": result.results['skip_visualization']
         }
         this.evaluationSetup = evaluation_setup;
       },
@@ -1,15 +1,218 @@
 from collections import defaultdict
 
 import networkx as nx
+import numpy as np
 from networkx import DiGraph
 from pandas import DataFrame
 
 from linkprediction.database_connector import DatabaseConnector
+from linkprediction.prediction_methods.preparation.candidates import CandidatePairs
+from linkprediction.prediction_methods.preparation.sampling import without_edges
 
 COLOR_PREDICTED_ONLY = '#EB5F5E'
 COLOR_MIXED = '#F3A533'
 
 
+# Initial number of entries of a PredictedEdges accumulator
+_INITIAL_CAPACITY = 1024
+
+
+class PredictedEdges:
+    """Compact accumulator of the edges predicted on a hierarchical graph.
+
+    A predicted edge is stored as the positions of its nodes in ``nodes``,
+    its summed score and a bitmask of its applied methods (see ``methods``)
+    in growable arrays, i.e. tens of bytes per edge instead of the nested
+    dicts of the hierarchical graph. Predictions are appended in amortised
+    O(1) and repeated predictions of an edge are merged lazily. Predictions
+    of edges of ``graph`` itself are dropped, like add_or_update_edge does.
+
+    add_or_update_edge and add_or_update_edges accept an accumulator in
+    place of the graph; ``materialize`` writes the hierarchical networkx
+    form once it is actually needed.
+
+    graph: flat or hierarchical graph the edges are predicted for
+    """
+
+    def __init__(self, graph: DiGraph):
+        self.graph = graph
+        self.nodes = list(graph)
+        self.node_index = {node: index for index, node in enumerate(self.nodes)}
+        # (method_name, method_specified) of every bit of the bitmasks
+        self.methods = []
+        self._method_bits = {}
+        self._original_keys = np.unique(self._keys(*_original_components(graph, self.node_index)))
+        self._size = 0
+        self._merged = 0
+        self._u = np.empty(_INITIAL_CAPACITY, dtype=np.int32)
+        self._v = np.empty(_INITIAL_CAPACITY, dtype=np.int32)
+        self._scores = np.empty(_INITIAL_CAPACITY, dtype=np.float64)
+        self._bits = np.zeros((_INITIAL_CAPACITY, 1), dtype=np.uint64)
+
+    def __len__(self):
+        self._merge()
+        return self._size
+
+    @property
+    def nbytes(self):
+        return self._u.nbytes + self._v.nbytes + self._scores.nbytes + self._bits.nbytes
+
+    def add(self, edge: tuple, method_name: str, method_specified: str, score: float):
+        """Add one prediction of the directed edge ``edge``."""
+        bit = self._method_bit(method_name, method_specified)
+        self._reserve(1)
+        index = self._size
+        self._u[index] = self.node_index[edge[0]]
+        self._v[index] = self.node_index[edge[1]]
+        self._scores[index] = score
+        self._bits[index] = 0
+        self._bits[index, bit // 64] = np.uint64(1) << np.uint64(bit % 64)
+        self._size += 1
+
+    def add_many(self, edges, method_name: str, methods_specified, scores):
+        """
+        Add many predictions at once.
+
+        edges: sequence of (source, target) node tuples or a CandidatePairs table
+        methods_specified: method_specified of every edge
+        scores: score of every edge
+        """
+        if hasattr(edges, 'pair_indices'):
+            u, v = edges.pair_indices(self.node_index)
+        else:
+            u = np.fromiter((self.node_index[edge[0]] for edge in edges),
+                            dtype=np.int32, count=len(edges))
+            v = np.fromiter((self.node_index[edge[1]] for edge in edges),
+                            dtype=np.int32, count=len(edges))
+        bits = np.fromiter((self._method_bit(method_name, method_specified)
+                            for method_specified in methods_specified),
+                           dtype=np.int64, count=len(u))
+        self._reserve(len(u))
+        start, stop = self._size, self._size + len(u)
+        self._u[start:stop] = u
+        self._v[start:stop] = v
+        self._scores[start:stop] = scores
+        self._bits[start:stop] = 0
+        self._bits[np.arange(start, stop), bits // 64] = np.left_shift(
+            np.uint64(1), (bits % 64).astype(np.uint64))
+        self._size = stop
+
+    def edges(self):
+        """
+        Return the predicted edges in the order of their first prediction as
+        int32 source and target positions, float64 summed scores and the
+        uint64 method bitmasks (one column per 64 methods).
+        """
+        self._merge()
+        size = self._size
+        return self._u[:size], self._v[:size], self._scores[:size], self._bits[:size]
+
+    def hits(self):
+        """
+        Return one (edge, method) pair per applied method of every predicted
+        edge as the edge positions in ``edges()`` and the method bits, in
+        the order of the edges and, per edge, of the bits.
+        """
+        bits = self.edges()[3]
+        methods = np.arange(len(self.methods))
+        applied = (bits[:, methods // 64] >> (methods % 64).astype(np.uint64)) & np.uint64(1)
+        return np.nonzero(applied)
+
+    def materialize(self, graph: DiGraph):
+        """
+        Add the predicted edges to ``graph``, the hierarchical form of the
+        accumulator's graph (see flat_to_hierarchical), with the same result
+        as calling add_or_update_edge on it for every prediction in order,
+        except that a method is listed only once per edge. Returns the graph.
+        """
+        u, v, scores, _ = self.edges()
+        rows, methods = self.hits()
+        applied_methods = [{} for _ in range(len(u))]
+        for row, method in zip(rows.tolist(), methods.tolist()):
+            method_name, method_specified = self.methods[method]
+            applied_methods[row].setdefault(method_name, []).append(method_specified)
+        nodes = self.nodes
+        for source, target, score, methods_of_edge in zip(
+                u.tolist(), v.tolist(), scores.tolist(), applied_methods):
+            _add_or_update_component(graph, (nodes[source], nodes[target]), methods_of_edge, score)
+        return graph
+
+    def _keys(self, u, v):
+        return np.asarray(u, dtype=np.int64) * len(self.nodes) + np.asarray(v, dtype=np.int64)
+
+    def _method_bit(self, method_name, method_specified):
+        method = (method_name, method_specified)
+        bit = self._method_bits.get(method)
+        if bit is None:
+            bit = self._method_bits[method] = len(self.methods)
+            self.methods.append(method)
+            if bit >= 64 * self._bits.shape[1]:
+                self._bits = np.hstack([self._bits, np.zeros((len(self._bits), 1), dtype=np.uint64)])
+        return bit
+
+    def _reserve(self, count):
+        if self._size + count <= len(self._u):
+            return
+        # Merging first keeps the arrays at most twice the number of edges
+        self._merge()
+        capacity = len(self._u)
+        while self._size + count > capacity:
+            capacity *= 2
+        if capacity == len(self._u):
+            return
+        for name in ('_u', '_v', '_scores', '_bits'):
+            array = getattr(self, name)
+            grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+            grown[:self._size] = array[:self._size]
+            setattr(self, name, grown)
+
+    def _merge(self):
+        if self._merged == self._size:
+            return
+        size = self._size
+        keys = self._keys(self._u[:size], self._v[:size])
+        positions = np.minimum(np.searchsorted(self._original_keys, keys),
+                               max(len(self._original_keys) - 1, 0))
+        original = (self._original_keys[positions] == keys) if len(self._original_keys) > 0 \
+            else np.zeros(size, dtype=bool)
+        entries = np.flatnonzero(~original)
+        _, first, inverse = np.unique(keys[entries], return_index=True, return_inverse=True)
+        # Slots in the order of the first prediction of every edge
+        order = np.argsort(first, kind='stable')
+        slots = np.empty(len(order), dtype=np.int64)
+        slots[order] = np.arange(len(order))
+        slots = slots[inverse]
+
+        scores = np.zeros(len(order), dtype=np.float64)
+        np.add.at(scores, slots, self._scores[entries])
+        bits = np.zeros((len(order), self._bits.shape[1]), dtype=np.uint64)
+        np.bitwise_or.at(bits, slots, self._bits[entries])
+
+        first_entries = entries[first[order]]
+        count = len(order)
+        self._u[:count] = self._u[first_entries]
+        self._v[:count] = self._v[first_entries]
+        self._scores[:count] = scores
+        self._bits[:count] = bits
+        self._size = self._merged = count
+
+
+def _original_components(graph: DiGraph, node_index: dict):
+    sources, targets = [], []
+    for edge in graph.edges:
+        edge_data = graph[edge[0]][edge[1]]
+        components = edge_data.get('edges', [{
+            'source': edge[0],
+            'target': edge[1],
+            'predicted': edge_data.get('predicted', False)
+        }])
+        for edge_comp in components:
+            if edge_comp['predicted'] is False:
+                sources.append(node_index[edge_comp['source']])
+                targets.append(node_index[edge_comp['target']])
+    return sources, targets
+
+
 # * Method to add edge to graph
 def add_or_update_edge(
     graph: nx.DiGraph,
@@ -17,6 +220,18 @@ def add_or_update_edge(
     method_name: str,
     method_specified: str,
     score: float
+):
+    if isinstance(graph, PredictedEdges):
+        graph.add(edge, method_name, method_specified, score)
+        return
+    _add_or_update_component(graph, edge, {method_name: [method_specified]}, score)
+
+
+def _add_or_update_component(
+    graph: nx.DiGraph,
+    edge: tuple,
+    applied_methods: dict,
+    score: float
 ):
     edge_exists = graph.has_edge(*edge)
     edge_rev_exists = graph.has_edge(edge[1], edge[0])
@@ -30,7 +245,7 @@ def add_or_update_edge(
                 'target': edge[1],
                 'predicted': True,
                 'prediction_score':score,
-                'applied_methods': {method_name: [method_specified]}
+                'applied_methods': {name: list(methods) for name, methods in applied_methods.items()}
             }],
             edge_color=COLOR_PREDICTED_ONLY,
             identifiers={
@@ -49,10 +264,11 @@ def add_or_update_edge(
             if single_edge['source'] == edge[0] and single_edge['target'] == edge[1]:
                 if single_edge['predicted'] is True:
                     single_edge['prediction_score'] += score
-                    if method_name in single_edge['applied_methods']:
-                        single_edge['applied_methods'][method_name].append(method_specified)
-                    else:
-                        single_edge['applied_methods'][method_name] = [method_specified]
+                    for name, methods in applied_methods.items():
+                        if name in single_edge['applied_methods']:
+                            single_edge['applied_methods'][name].extend(methods)
+                        else:
+                            single_edge['applied_methods'][name] = list(methods)
                 add_edge = False
             if single_edge['source'] == edge[1] and single_edge['target'] == edge[0] \
                     and single_edge['predicted'] is True:
@@ -63,12 +279,35 @@ def add_or_update_edge(
                 'target': edge[1],
                 'predicted': True,
                 'prediction_score': score,
-                'applied_methods': {method_name: [method_specified]}
+                'applied_methods': {name: list(methods) for name, methods in applied_methods.items()}
             })
             if reverse_edge_predicted is False:
                 single_edges['edge_color'] = COLOR_MIXED
 
 
+def add_or_update_edges(
+    graph: nx.DiGraph,
+    edges,
+    method_name: str,
+    methods_specified,
+    scores
+):
+    """
+    Add or update many predicted edges at once, in the given order (see
+    add_or_update_edge).
+
+    graph: hierarchical graph or PredictedEdges accumulator
+    edges: iterable of (source, target) node tuples
+    methods_specified: method_specified of every edge
+    scores: score of every edge
+    """
+    if isinstance(graph, PredictedEdges):
+        graph.add_many(edges, method_name, methods_specified, scores)
+        return
+    for edge, method_specified, score in zip(edges, methods_specified, scores):
+        add_or_update_edge(graph, edge, method_name, method_specified, score)
+
+
 def load_predicted_graph_from_db(predicted_network_id: str):
     db = DatabaseConnector()
     nodes = db.get_nodes_by_id('predicted_network_id', predicted_network_id)
@@ -178,7 +417,67 @@ def save_predicted_graph_to_db(predicted_graph: DiGraph, predicted_network_id: s
 
 
 def get_st_features_from_predicted_graph(predicted_graph: DiGraph, node_pairs: list):
-    df = DataFrame({'node_pairs': node_pairs})
+    df = get_st_features(predicted_graph, CandidatePairs.from_node_pairs(node_pairs))
+    df.insert(0, 'node_pairs', list(node_pairs))
+    return df
+
+
+def get_st_features(predicted_graph: DiGraph, candidates: CandidatePairs):
+    """
+    Return a binary DataFrame with one row per candidate pair and one column
+    per prediction method that predicted at least one of the candidates
+    (in the order of their first hit). A cell is 1 if the method predicted
+    the directed edge of the pair.
+
+    predicted_graph: hierarchical graph or PredictedEdges accumulator
+
+    The candidates are indexed once by their sorted int64 pair keys, so
+    every predicted edge component costs one binary search instead of a
+    scan of all candidates.
+    """
+    node_index = {node: index for index, node in enumerate(candidates.nodes)}
+    n = len(node_index)
+    if isinstance(predicted_graph, PredictedEdges):
+        sources, targets, method_ids, names = _accumulated_hits(predicted_graph, node_index)
+    else:
+        sources, targets, method_ids, names = _graph_hits(predicted_graph, node_index)
+
+    keys = candidates.keys()
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    hit_keys = np.array(sources, dtype=np.int64) * n + np.array(targets, dtype=np.int64)
+    positions = np.minimum(np.searchsorted(sorted_keys, hit_keys), max(len(keys) - 1, 0))
+    found = sorted_keys[positions] == hit_keys if len(keys) > 0 else np.zeros(len(hit_keys), dtype=bool)
+    rows = order[positions[found]]
+    method_ids = np.asarray(method_ids, dtype=np.int64)[found]
+
+    # Columns of the methods with hits, ordered by their first hit
+    columns, first_hits = np.unique(method_ids, return_index=True)
+    columns = columns[np.argsort(first_hits)]
+    column_index = np.zeros(len(names), dtype=np.int64)
+    column_index[columns] = np.arange(len(columns))
+
+    features = np.zeros((len(candidates), len(columns)), dtype=np.uint8)
+    features[rows, column_index[method_ids]] = 1
+    return DataFrame(features, columns=[names[column] for column in columns])
+
+
+def align_st_features(train_df: DataFrame, test_df: DataFrame):
+    """
+    Return the social-theory features of the train and test candidates (see
+    get_st_features) with the same columns. Methods without hits among the
+    candidates of one set get a column of zeros there. Columns are ordered
+    like ``train_df``, followed by the columns only ``test_df`` has.
+    """
+    columns = list(train_df.columns) + [column for column in test_df.columns
+                                        if column not in train_df.columns]
+    return (train_df.reindex(columns=columns, fill_value=0),
+            test_df.reindex(columns=columns, fill_value=0))
+
+
+def _graph_hits(predicted_graph: DiGraph, node_index: dict):
+    sources, targets, method_ids = [], [], []
+    methods = {}
     for edge in predicted_graph.edges:
         edge_data = predicted_graph[edge[0]][edge[1]]
         if 'edges' not in edge_data:
@@ -186,17 +485,29 @@ def get_st_features_from_predicted_graph(predicted_graph: DiGraph, node_pairs: l
         for edge_comp in edge_data['edges']:
             if edge_comp['predicted'] is False or 'applied_methods' not in edge_comp:
                 continue
-            node_pair = df.loc[df['node_pairs'] == (edge_comp['source'], edge_comp['target'])]
-            if node_pair.empty is True:
+            source = node_index.get(edge_comp['source'])
+            target = node_index.get(edge_comp['target'])
+            if source is None or target is None:
                 continue
-            applied_methods = []
             for method_category in edge_comp['applied_methods']:
                 for method in edge_comp['applied_methods'][method_category]:
-                    if method not in df.columns:
-                        df[method] = 0
-                    df_index_filter = df['node_pairs'] == (edge_comp['source'], edge_comp['target'])
-                    df.loc[df_index_filter, method] = 1
-    return df
+                    sources.append(source)
+                    targets.append(target)
+                    method_ids.append(methods.setdefault(method, len(methods)))
+    return sources, targets, method_ids, list(methods)
+
+
+def _accumulated_hits(predicted_edges: PredictedEdges, node_index: dict):
+    # Columns are named by method_specified only, as in _graph_hits
+    methods = {}
+    method_ids = np.array([methods.setdefault(method_specified, len(methods))
+                           for _, method_specified in predicted_edges.methods], dtype=np.int64)
+    translation = np.array([node_index.get(node, -1) for node in predicted_edges.nodes], dtype=np.int64)
+    u, v, _, _ = predicted_edges.edges()
+    rows, bits = predicted_edges.hits()
+    sources, targets = translation[u[rows]], translation[v[rows]]
+    known = (sources >= 0) & (targets >= 0)
+    return sources[known], targets[known], method_ids[bits[known]], list(methods)
 
 
 def hierarchical_to_flat(h_graph: DiGraph):
@@ -249,6 +560,40 @@ def hierarchical_to_flat(h_graph: DiGraph):
     return f_graph
 
 
+def hierarchical_to_flat_structure(h_graph: DiGraph):
+    """
+    Return the nodes (with their attributes) and directed edges of
+    hierarchical_to_flat(h_graph) in the same order, but without any edge
+    attributes. Enough for sampling and prediction when no predicted graph
+    is built.
+    """
+    f_graph = DiGraph()
+    f_graph.add_nodes_from(h_graph.nodes(data=True))
+    f_graph.add_edges_from(h_graph.edges)
+    for edge in h_graph.edges:
+        for edge_comp in h_graph[edge[0]][edge[1]].get('edges', []):
+            f_graph.add_edge(edge_comp['source'], edge_comp['target'])
+    return f_graph
+
+
+def hierarchical_view(f_graph: DiGraph):
+    """
+    Return a read-only view of f_graph with the edges of
+    flat_to_hierarchical(f_graph), i.e. with the later edge of every
+    reciprocal pair hidden, without copying nodes, edges or attributes. The
+    edges have no components; these are built by flat_to_hierarchical when
+    the predicted graph is saved.
+    """
+    seen = set()
+    hidden = []
+    for edge in f_graph.edges:
+        if (edge[1], edge[0]) in seen:
+            hidden.append(edge)
+        else:
+            seen.add(edge)
+    return without_edges(f_graph, hidden)
+
+
 def flat_to_hierarchical(f_graph: DiGraph):
     h_graph = f_graph.copy()
     for edge in h_graph.edges:
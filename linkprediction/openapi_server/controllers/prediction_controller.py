@@ -262,9 +262,17 @@ def handle_prediction_state_by_project(project_id, body):  # noqa: E501
                 configuration['ml_preprocessing'],
                 configuration['train_sampling_ratio'],
                 configuration['test_sampling_ratio'],
-                configuration['random_seed'])
-
-            prediction_process = multiprocessing.Process(target=worker.predict, daemon=True)
+                configuration['random_seed'],
+                configuration.get('worker_processes', 1),
+                configuration.get('candidate_strategy', 'all'),
+                configuration.get('negative_ratio', 1.0),
+                configuration.get('candidate_max_distance', 2),
+                configuration.get('skip_visualization', False))
+
+            # Daemonic processes cannot start the worker's process pool
+            processes = configuration.get('worker_processes', 1)
+            prediction_process = multiprocessing.Process(target=worker.predict,
+                                                         daemon=processes <= 1)
 
             DatabaseConnector.get_db_instance().add_linkprediction_status(
                 0,
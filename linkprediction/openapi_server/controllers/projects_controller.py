@@ -80,7 +80,12 @@ def create_project(**kwargs):  # noqa: E501
             "with_validation": False,
             "train_sampling_ratio": 0.8,
             "test_sampling_ratio": 0.9,
-            "ml_preprocessing": False
+            "ml_preprocessing": False,
+            "worker_processes": 1,
+            "candidate_strategy": "all",
+            "negative_ratio": 1.0,
+            "candidate_max_distance": 2,
+            "skip_visualization": False
         }
         db.add_or_update_evaluation_result(project_id, default_evaluation_setup)
 
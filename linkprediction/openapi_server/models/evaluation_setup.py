@@ -15,7 +15,7 @@ class EvaluationSetup(Model):
     Do not edit the class manually.
     """
 
-    def __init__(self, random_seed=None, with_validation=None, train_sampling_ratio=None, test_sampling_ratio=None, ml_preprocessing=None):  # noqa: E501
+    def __init__(self, random_seed=None, with_validation=None, train_sampling_ratio=None, test_sampling_ratio=None, ml_preprocessing=None, worker_processes=None, candidate_strategy=None, negative_ratio=None, candidate_max_distance=None, skip_visualization=None):  # noqa: E501
         """EvaluationSetup - a model defined in OpenAPI
 
         :param random_seed: The random_seed of this EvaluationSetup.  # noqa: E501
@@ -28,13 +28,28 @@ class EvaluationSetup(Model):
         :type test_sampling_ratio: float
         :param ml_preprocessing: The ml_preprocessing of this EvaluationSetup.  # noqa: E501
         :type ml_preprocessing: bool
+        :param worker_processes: The worker_processes of this EvaluationSetup.  # noqa: E501
+        :type worker_processes: int
+        :param candidate_strategy: The candidate_strategy of this EvaluationSetup.  # noqa: E501
+        :type candidate_strategy: str
+        :param negative_ratio: The negative_ratio of this EvaluationSetup.  # noqa: E501
+        :type negative_ratio: float
+        :param candidate_max_distance: The candidate_max_distance of this EvaluationSetup.  # noqa: E501
+        :type candidate_max_distance: int
+        :param skip_visualization: The skip_visualization of this EvaluationSetup.  # noqa: E501
+        :type skip_visualization: bool
         """
         self.openapi_types = {
             'random_seed': int,
             'with_validation': bool,
             'train_sampling_ratio': float,
             'test_sampling_ratio': float,
-            'ml_preprocessing': bool
+            'ml_preprocessing': bool,
+            'worker_processes': int,
+            'candidate_strategy': str,
+            'negative_ratio': float,
+            'candidate_max_distance': int,
+            'skip_visualization': bool
         }
 
         self.attribute_map = {
@@ -42,7 +57,12 @@ class EvaluationSetup(Model):
             'with_validation': 'with_validation',
             'train_sampling_ratio': 'train_sampling_ratio',
             'test_sampling_ratio': 'test_sampling_ratio',
-            'ml_preprocessing': 'ml_preprocessing'
+            'ml_preprocessing': 'ml_preprocessing',
+            'worker_processes': 'worker_processes',
+            'candidate_strategy': 'candidate_strategy',
+            'negative_ratio': 'negative_ratio',
+            'candidate_max_distance': 'candidate_max_distance',
+            'skip_visualization': 'skip_visualization'
         }
 
         self._random_seed = random_seed
@@ -50,6 +70,11 @@ class EvaluationSetup(Model):
         self._train_sampling_ratio = train_sampling_ratio
         self._test_sampling_ratio = test_sampling_ratio
         self._ml_preprocessing = ml_preprocessing
+        self._worker_processes = worker_processes
+        self._candidate_strategy = candidate_strategy
+        self._negative_ratio = negative_ratio
+        self._candidate_max_distance = candidate_max_distance
+        self._skip_visualization = skip_visualization
 
     @classmethod
     def from_dict(cls, dikt) -> 'EvaluationSetup':
@@ -181,4 +206,121 @@ class EvaluationSetup(Model):
         if ml_preprocessing is None:
             raise ValueError("Invalid value for `ml_preprocessing`, must not be `None`")  # noqa: E501
 
-        self._ml_preprocessing = ml_preprocessing
\ No newline at end of file
+        self._ml_preprocessing = ml_preprocessing
+
+    @property
+    def worker_processes(self):
+        """Gets the worker_processes of this EvaluationSetup.
+
+
+        :return: The worker_processes of this EvaluationSetup.
+        :rtype: int
+        """
+        return self._worker_processes
+
+    @worker_processes.setter
+    def worker_processes(self, worker_processes):
+        """Sets the worker_processes of this EvaluationSetup.
+
+
+        :param worker_processes: The worker_processes of this EvaluationSetup.
+        :type worker_processes: int
+        """
+        if worker_processes is not None and worker_processes < 1:  # noqa: E501
+            raise ValueError("Invalid value for `worker_processes`, must be a value greater than or equal to `1`")  # noqa: E501
+
+        self._worker_processes = worker_processes
+
+    @property
+    def candidate_strategy(self):
+        """Gets the candidate_strategy of this EvaluationSetup.
+
+
+        :return: The candidate_strategy of this EvaluationSetup.
+        :rtype: str
+        """
+        return self._candidate_strategy
+
+    @candidate_strategy.setter
+    def candidate_strategy(self, candidate_strategy):
+        """Sets the candidate_strategy of this EvaluationSetup.
+
+
+        :param candidate_strategy: The candidate_strategy of this EvaluationSetup.
+        :type candidate_strategy: str
+        """
+        allowed_values = ["all", "negative_sampling", "distance"]  # noqa: E501
+        if candidate_strategy is not None and candidate_strategy not in allowed_values:
+            raise ValueError(
+                "Invalid value for `candidate_strategy` ({0}), must be one of {1}"
+                .format(candidate_strategy, allowed_values)
+            )
+
+        self._candidate_strategy = candidate_strategy
+
+    @property
+    def negative_ratio(self):
+        """Gets the negative_ratio of this EvaluationSetup.
+
+
+        :return: The negative_ratio of this EvaluationSetup.
+        :rtype: float
+        """
+        return self._negative_ratio
+
+    @negative_ratio.setter
+    def negative_ratio(self, negative_ratio):
+        """Sets the negative_ratio of this EvaluationSetup.
+
+
+        :param negative_ratio: The negative_ratio of this EvaluationSetup.
+        :type negative_ratio: float
+        """
+        if negative_ratio is not None and negative_ratio < 0:  # noqa: E501
+            raise ValueError("Invalid value for `negative_ratio`, must be a value greater than or equal to `0`")  # noqa: E501
+
+        self._negative_ratio = negative_ratio
+
+    @property
+    def candidate_max_distance(self):
+        """Gets the candidate_max_distance of this EvaluationSetup.
+
+
+        :return: The candidate_max_distance of this EvaluationSetup.
+        :rtype: int
+        """
+        return self._candidate_max_distance
+
+    @candidate_max_distance.setter
+    def candidate_max_distance(self, candidate_max_distance):
+        """Sets the candidate_max_distance of this EvaluationSetup.
+
+
+        :param candidate_max_distance: The candidate_max_distance of this EvaluationSetup.
+        :type candidate_max_distance: int
+        """
+        if candidate_max_distance is not None and candidate_max_distance < 2:  # noqa: E501
+            raise ValueError("Invalid value for `candidate_max_distance`, must be a value greater than or equal to `2`")  # noqa: E501
+
+        self._candidate_max_distance = candidate_max_distance
+
+    @property
+    def skip_visualization(self):
+        """Gets the skip_visualization of this EvaluationSetup.
+
+
+        :return: The skip_visualization of this EvaluationSetup.
+        :rtype: bool
+        """
+        return self._skip_visualization
+
+    @skip_visualization.setter
+    def skip_visualization(self, skip_visualization):
+        """Sets the skip_visualization of this EvaluationSetup.
+
+
+        :param skip_visualization: The skip_visualization of this EvaluationSetup.
+        :type skip_visualization: bool
+        """
+
+        self._skip_visualization = skip_visualization
@@ -0,0 +1,49 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+import unittest
+
+from linkprediction.openapi_server.models.evaluation_setup import EvaluationSetup  # noqa: E501
+
+
+class TestEvaluationSetup(unittest.TestCase):
+    """EvaluationSetup model round-trip tests"""
+
+    evaluation_setup = {
+        "random_seed": 42,
+        "with_validation": True,
+        "train_sampling_ratio": 0.8,
+        "test_sampling_ratio": 0.9,
+        "ml_preprocessing": False,
+        "worker_processes": 4,
+        "candidate_strategy": "distance",
+        "negative_ratio": 2.0,
+        "candidate_max_distance": 3,
+        "skip_visualization": True
+    }
+
+    def test_round_trip(self):
+        """Test case for from_dict and to_dict with all fields set"""
+        model = EvaluationSetup.from_dict(self.evaluation_setup)
+        self.assertEqual(model.to_dict(), self.evaluation_setup)
+
+    def test_optional_fields(self):
+        """Test case for from_dict without the optional fields"""
+        required = {key: self.evaluation_setup[key] for key in
+                    ("random_seed", "with_validation", "train_sampling_ratio", "ml_preprocessing")}
+        model = EvaluationSetup.from_dict(required)
+        self.assertIsNone(model.candidate_max_distance)
+        self.assertIsNone(model.skip_visualization)
+
+    def test_invalid_values(self):
+        """Test case for the validation of the candidate fields"""
+        for key, value in (("candidate_strategy", "nearest"),
+                           ("candidate_max_distance", 1),
+                           ("negative_ratio", -1.0),
+                           ("worker_processes", 0)):
+            with self.assertRaises(ValueError):
+                EvaluationSetup.from_dict(dict(self.evaluation_setup, **{key: value}))
+
+
+if __name__ == '__main__':
+    unittest.main()
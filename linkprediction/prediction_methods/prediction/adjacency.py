@@ -0,0 +1,143 @@
+import sys
+from hashlib import blake2b
+
+import networkx as nx
+import numpy as np
+from scipy.sparse import csr_matrix
+
+
+class CSRAdjacency:
+    """Attribute-free adjacency of a graph in compressed sparse row layout.
+
+    Nodes are addressed by their position in ``nodes``. The neighbours of
+    node ``i`` are ``indices[indptr[i]:indptr[i + 1]]`` in ascending order.
+    Self-loops are kept out of the rows and flagged in ``self_loops`` so
+    that intersections match ``networkx.common_neighbors``.
+    """
+
+    def __init__(self, nodes, indptr, indices, self_loops, directed=False):
+        self.nodes = nodes
+        self.node_index = {node: index for index, node in enumerate(nodes)}
+        self.indptr = indptr
+        self.indices = indices
+        self.self_loops = self_loops
+        self.directed = directed
+        # Degrees as reported by networkx: a self-loop counts twice in
+        # undirected graphs and once in the out-degree of directed ones.
+        self.degrees = np.diff(indptr) + (1 if directed else 2) * self_loops
+        self._matrix = None
+        self._fingerprint = None
+
+    @classmethod
+    def from_graph(cls, graph, directed=None):
+        """Build the adjacency of a networkx graph.
+
+        graph: networkx (Di)Graph
+        directed: keep edge directions (out-neighbours only). Defaults to
+            the directedness of ``graph``; ``False`` symmetrises a DiGraph
+            without copying it.
+        """
+        if directed is None:
+            directed = graph.is_directed()
+        nodes = list(graph)
+        node_index = {node: index for index, node in enumerate(nodes)}
+        edges = np.fromiter(
+            (node_index[node] for edge in graph.edges() for node in edge),
+            dtype=np.int64,
+            count=2 * graph.number_of_edges()
+        ).reshape(-1, 2)
+        return cls.from_arrays(nodes, edges[:, 0], edges[:, 1], directed)
+
+    @classmethod
+    def from_arrays(cls, nodes, sources, targets, directed=False):
+        """Build the adjacency from edge endpoint index arrays."""
+        n = len(nodes)
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+
+        loops = sources == targets
+        self_loops = np.zeros(n, dtype=bool)
+        self_loops[sources[loops]] = True
+        sources, targets = sources[~loops], targets[~loops]
+        if not directed:
+            sources, targets = (np.concatenate([sources, targets]),
+                                np.concatenate([targets, sources]))
+
+        # Sorting the encoded keys orders rows and their neighbours at once
+        # and drops parallel edges (e.g. reciprocal edges of a DiGraph).
+        keys = np.unique(sources * n + targets)
+        rows = keys // n
+        indices = (keys % n).astype(np.int32)
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+        return cls(nodes, indptr, indices, self_loops, directed)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    @property
+    def nbytes(self):
+        return (self.indptr.nbytes + self.indices.nbytes + self.self_loops.nbytes
+                + self.degrees.nbytes + 2 * sys.getsizeof(self.node_index))
+
+    @property
+    def fingerprint(self):
+        """Digest of nodes and edges; equal for equally structured graphs."""
+        if self._fingerprint is None:
+            digest = blake2b(digest_size=16)
+            digest.update(str(hash(tuple(self.nodes))).encode())
+            for array in (self.indptr, self.indices, self.self_loops):
+                digest.update(array.tobytes())
+            digest.update(b'directed' if self.directed else b'undirected')
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+
+    @property
+    def matrix(self):
+        """Loop-free adjacency as a scipy CSR matrix sharing the arrays."""
+        if self._matrix is None:
+            n = len(self.nodes)
+            self._matrix = csr_matrix(
+                (np.ones(len(self.indices)), self.indices, self.indptr),
+                shape=(n, n)
+            )
+        return self._matrix
+
+    def neighbors(self, index):
+        return self.indices[self.indptr[index]:self.indptr[index + 1]]
+
+    def pair_indices(self, node_pairs):
+        """
+        Translate node pairs to two int32 arrays of node positions.
+
+        node_pairs: sequence of node tuples or a CandidatePairs table
+        """
+        node_index = self.node_index
+        if hasattr(node_pairs, 'pair_indices'):
+            return node_pairs.pair_indices(node_index)
+        count = len(node_pairs)
+        u = np.fromiter((node_index[pair[0]] for pair in node_pairs),
+                        dtype=np.int32, count=count)
+        v = np.fromiter((node_index[pair[1]] for pair in node_pairs),
+                        dtype=np.int32, count=count)
+        return u, v
+
+
+def get_adjacency(graph, cache, directed=None):
+    """Return the CSR adjacency of ``graph``, built once per graph and cache."""
+    if isinstance(graph, CSRAdjacency):
+        return graph
+    if directed is None:
+        directed = graph.is_directed()
+    return cache.get(
+        ('adjacency', cache.token(graph), directed),
+        lambda: CSRAdjacency.from_graph(graph, directed=directed)
+    )
+
+
+def to_undirected_graph(graph):
+    """Return an undirected copy of ``graph`` without node and edge attributes."""
+    undirected_graph = nx.Graph()
+    undirected_graph.add_nodes_from(graph)
+    undirected_graph.add_edges_from(graph.edges())
+    return undirected_graph
@@ -0,0 +1,100 @@
+import numpy as np
+from networkx.algorithms import community
+
+from .adjacency import get_adjacency, to_undirected_graph
+from .graph_cache import GraphCache
+
+COMMUNITY_DETECTION_METHODS = (
+    'girvan_newman',
+    'label_propagation',
+    'greedy_modularity',
+    'louvain'
+)
+
+
+def detect_communities(graph, method='girvan_newman', iterations=1,
+                       seed=None, cache: GraphCache = None):
+    """
+    Detect the communities of the undirected structure of a graph.
+
+    graph: networkx (Di)Graph
+    method: one of COMMUNITY_DETECTION_METHODS
+        girvan_newman -> divisive edge betweenness, exact but O(m^2 n)
+        label_propagation -> semi-synchronous label propagation, O(m)
+        greedy_modularity -> Clauset-Newman-Moore modularity, O(n log^2 n)
+        louvain -> Louvain modularity (requires networkx >= 2.8)
+    iterations: level of the girvan_newman dendrogram (>= 1)
+    seed: random seed of the louvain method
+    cache: GraphCache of the run. The partition is stored per graph
+        structure, so predictors working on the same graph (e.g.
+        SameCommunity and StructuralHoleTheory) detect it only once.
+
+    Returns a tuple of node sets.
+    """
+    if method not in COMMUNITY_DETECTION_METHODS:
+        raise ValueError(
+            "Invalid value for `community_detection` ({0}), must be one of {1}"
+            .format(method, COMMUNITY_DETECTION_METHODS)
+        )
+    if iterations < 1:
+        raise ValueError('Invalid iterations value. It must be greater '
+                         'than or equal to 1!')
+    if cache is None:
+        cache = GraphCache()
+
+    adjacency = get_adjacency(graph, cache, directed=False)
+    return cache.get(
+        ('communities',) + _partition_key(adjacency, method, iterations, seed),
+        lambda: _detect(graph, method, iterations, seed)
+    )
+
+
+def _partition_key(adjacency, method, iterations, seed):
+    parameters = (iterations,) if method == 'girvan_newman' else ()
+    parameters += (seed,) if method == 'louvain' else ()
+    return (adjacency.fingerprint, method) + parameters
+
+
+def detect_community_labels(graph, method='girvan_newman', iterations=1,
+                            seed=None, cache: GraphCache = None):
+    """
+    Detect the communities of a graph (see detect_communities) and return
+    them as an int32 array with the community label of every node, in the
+    node order of the graph's CSR adjacency. Nodes outside of all
+    communities are labelled -1.
+    """
+    if cache is None:
+        cache = GraphCache()
+    communities = detect_communities(graph, method, iterations, seed, cache)
+    adjacency = get_adjacency(graph, cache, directed=False)
+    return cache.get(
+        ('community_labels',) + _partition_key(adjacency, method, iterations, seed),
+        lambda: _to_labels(communities, adjacency.node_index)
+    )
+
+
+def _to_labels(communities, node_index):
+    labels = np.full(len(node_index), -1, dtype=np.int32)
+    for label, nodes in enumerate(communities):
+        labels[[node_index[node] for node in nodes]] = label
+    return labels
+
+
+def _detect(graph, method, iterations, seed):
+    if graph.is_directed():
+        graph = to_undirected_graph(graph)
+
+    if method == 'girvan_newman':
+        communities_generator = community.girvan_newman(graph)
+        for i in range(iterations):
+            level_communities = next(communities_generator)
+        return tuple(level_communities)
+    if method == 'label_propagation':
+        return tuple(community.label_propagation_communities(graph))
+    if method == 'greedy_modularity':
+        return tuple(community.greedy_modularity_communities(graph))
+
+    if not hasattr(community, 'louvain_communities'):
+        raise ValueError('Community detection `louvain` requires networkx 2.8 '
+                         'or newer. Use `greedy_modularity` instead!')
+    return tuple(community.louvain_communities(graph, seed=seed))
@@ -0,0 +1,148 @@
+import sys
+import weakref
+from collections import OrderedDict
+from functools import partial
+
+import numpy as np
+
+# Default memory budget of the cache of one prediction run
+DEFAULT_MAX_BYTES = 2 ** 30
+
+
+class GraphCache:
+    """Memory-bounded LRU cache shared by all predictors of a prediction run.
+
+    Holds per-graph intermediate results (adjacencies, communities, node
+    centralities, ...) so that predictors working on
+    the same graph compute them only once. Entries are evicted least
+    recently used first as soon as their estimated size exceeds
+    ``max_bytes``; evicted entries are simply recomputed on the next
+    request. Entries keyed by the token of an object (see token) are
+    dropped as soon as the object is garbage collected.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._tokens = {}
+        self._token_keys = {}
+        self._next_token = 0
+
+    def get(self, key, compute):
+        """Return the value cached under ``key`` or compute and cache it."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[0]
+
+        self.misses += 1
+        value = compute()
+        nbytes = _estimate_nbytes(value)
+        tokens = list(_tokens_of(key))
+        # Keys with the token of a released or untracked object cannot be hit again
+        if nbytes <= self.max_bytes and all(token in self._token_keys for token in tokens):
+            self._entries[key] = (value, nbytes)
+            self.nbytes += nbytes
+            for token in tokens:
+                self._token_keys[token].add(key)
+            self._evict()
+        return value
+
+    def token(self, obj):
+        """Return a key component identifying ``obj`` while it is alive.
+
+        Unlike ``id(obj)`` the token is never reused for another object
+        during the lifetime of the cache. The cache only holds a weak
+        reference to ``obj``: once it is garbage collected, the entries
+        whose keys contain its token are evicted. Objects without weak
+        reference support (e.g. lists) get a new token on every call, so
+        results keyed by them are only shared within that call.
+        """
+        reference, token = self._tokens.get(id(obj), (None, None))
+        if reference is not None and reference() is obj:
+            return token
+
+        token = CacheToken(self._next_token)
+        self._next_token += 1
+        try:
+            reference = weakref.ref(obj, partial(_release, weakref.ref(self), id(obj), token))
+        except TypeError:
+            return token
+        self._tokens[id(obj)] = (reference, token)
+        self._token_keys[token] = set()
+        return token
+
+    def clear(self):
+        self._entries.clear()
+        self._tokens.clear()
+        self._token_keys.clear()
+        self.nbytes = 0
+
+    def record(self, hits, misses):
+        """Add requests served by another cache to the statistics, e.g. by the
+        chunk-local caches of fill_predictions."""
+        self.hits += hits
+        self.misses += misses
+
+    @property
+    def hit_rate(self):
+        requests = self.hits + self.misses
+        return self.hits / requests if requests != 0 else 0.0
+
+    def summary(self):
+        return (f'{self.hits} hits, {self.misses} misses '
+                f'(hit rate {self.hit_rate:.1%}), {self.evictions} evictions, '
+                f'{self.nbytes / 2 ** 20:.1f} MiB cached')
+
+    def _evict(self):
+        while self.nbytes > self.max_bytes and self._entries:
+            key, (_, nbytes) = self._entries.popitem(last=False)
+            self.nbytes -= nbytes
+            self.evictions += 1
+            for token in _tokens_of(key):
+                self._token_keys.get(token, set()).discard(key)
+
+    def _release(self, object_id, token):
+        """Forget the token of a garbage collected object and its entries."""
+        if self._tokens.get(object_id, (None, None))[1] is token:
+            del self._tokens[object_id]
+        for key in self._token_keys.pop(token, ()):
+            # Keys with several tokens may have been released already
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.nbytes -= entry[1]
+
+
+class CacheToken(int):
+    """Integer key component identifying an object, see GraphCache.token."""
+
+    __slots__ = ()
+
+
+def _release(cache_reference, object_id, token, _):
+    cache = cache_reference()
+    if cache is not None:
+        cache._release(object_id, token)
+
+
+def _tokens_of(key):
+    if isinstance(key, CacheToken):
+        yield key
+    elif isinstance(key, tuple):
+        for item in key:
+            yield from _tokens_of(item)
+
+
+def _estimate_nbytes(value):
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(_estimate_nbytes(item) for item in value)
+    if hasattr(value, 'nbytes'):
+        return value.nbytes
+    return sys.getsizeof(value)
@@ -0,0 +1,196 @@
+"""
+Numba-compiled kernels for scoring node pairs and enumerating triads on CSR
+adjacency arrays.
+
+All kernels expect the sorted neighbour rows of a CSRAdjacency (int64
+``indptr``, int32 ``indices``) and int32 node position arrays ``u`` and
+``v``. They are compiled on first use and cached on disk (cache=True), so
+later prediction runs load the machine code instead of recompiling it.
+"""
+import numpy as np
+from numba import njit
+
+
+@njit(cache=True, nogil=True)
+def _intersect(indptr, indices, u, v, weights, weighted):
+    i, i_stop = indptr[u], indptr[u + 1]
+    j, j_stop = indptr[v], indptr[v + 1]
+    total = 0.0
+    while i < i_stop and j < j_stop:
+        a = indices[i]
+        b = indices[j]
+        if a < b:
+            i += 1
+        elif b < a:
+            j += 1
+        else:
+            total += weights[a] if weighted else 1.0
+            i += 1
+            j += 1
+    return total
+
+
+@njit(cache=True, nogil=True)
+def intersection_counts(indptr, indices, u, v):
+    """Number of common neighbours of each pair (sorted-merge intersection)."""
+    counts = np.empty(len(u), dtype=np.int64)
+    no_weights = np.empty(0, dtype=np.float64)
+    for k in range(len(u)):
+        counts[k] = np.int64(_intersect(indptr, indices, u[k], v[k], no_weights, False))
+    return counts
+
+
+@njit(cache=True, nogil=True)
+def weighted_intersection_sums(indptr, indices, u, v, weights):
+    """Sum of the node ``weights`` over the common neighbours of each pair."""
+    sums = np.empty(len(u), dtype=np.float64)
+    for k in range(len(u)):
+        sums[k] = _intersect(indptr, indices, u[k], v[k], weights, True)
+    return sums
+
+
+@njit(cache=True, nogil=True)
+def pair_degrees(degrees, u, v):
+    """Degrees of both nodes of each pair."""
+    degrees_u = np.empty(len(u), dtype=np.int64)
+    degrees_v = np.empty(len(v), dtype=np.int64)
+    for k in range(len(u)):
+        degrees_u[k] = degrees[u[k]]
+        degrees_v[k] = degrees[v[k]]
+    return degrees_u, degrees_v
+
+
+@njit(cache=True, nogil=True)
+def _has_edge(indptr, indices, u, v):
+    lo, hi = indptr[u], indptr[u + 1]
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if indices[mid] < v:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo < indptr[u + 1] and indices[lo] == v
+
+
+@njit(cache=True, nogil=True)
+def _tricode(indptr, indices, a, b, c):
+    code = 0
+    if _has_edge(indptr, indices, a, b):
+        code |= 1
+    if _has_edge(indptr, indices, b, a):
+        code |= 2
+    if _has_edge(indptr, indices, a, c):
+        code |= 4
+    if _has_edge(indptr, indices, c, a):
+        code |= 8
+    if _has_edge(indptr, indices, b, c):
+        code |= 16
+    if _has_edge(indptr, indices, c, b):
+        code |= 32
+    return code
+
+
+@njit(cache=True, nogil=True)
+def _emit(indptr, indices, a, b, c, wanted, count, fill, codes, out_a, out_b, out_c):
+    code = _tricode(indptr, indices, a, b, c)
+    if not wanted[code]:
+        return count
+    if fill:
+        codes[count] = code
+        out_a[count] = a
+        out_b[count] = b
+        out_c[count] = c
+    return count + 1
+
+
+@njit(cache=True, nogil=True)
+def connected_triads(indptr, indices, directed_indptr, directed_indices, start, stop,
+                     wanted, dyadic, fill, codes, out_a, out_b, out_c):
+    """
+    Enumerate the triads whose lowest connected dyad starts at one of the
+    nodes ``start`` to ``stop - 1`` (Batagelj and Mrvar). Each triad is
+    visited once.
+
+    indptr, indices: symmetric CSR adjacency used for the enumeration
+    directed_indptr, directed_indices: CSR adjacency for the tricodes
+    wanted: bool array of the 64 tricodes to keep
+    dyadic: also enumerate triads with only one connected dyad
+    fill: write the triads to ``codes`` and the sorted node positions
+        ``out_a < out_b < out_c``, otherwise only count them
+
+    Returns the number of triads kept.
+    """
+    n = len(indptr) - 1
+    stamps = np.full(n if dyadic else 0, -1, dtype=np.int64)
+    count = 0
+    dyad = 0
+    for v in range(start, stop):
+        for i in range(indptr[v], indptr[v + 1]):
+            u = indices[i]
+            if u <= v:
+                continue
+            # Walk the merged, sorted neighbourhoods of v and u
+            p, p_stop = indptr[v], indptr[v + 1]
+            q, q_stop = indptr[u], indptr[u + 1]
+            while p < p_stop or q < q_stop:
+                if q >= q_stop or (p < p_stop and indices[p] < indices[q]):
+                    w = indices[p]
+                    neighbor_of_v = True
+                    p += 1
+                elif p >= p_stop or indices[q] < indices[p]:
+                    w = indices[q]
+                    neighbor_of_v = False
+                    q += 1
+                else:
+                    w = indices[p]
+                    neighbor_of_v = True
+                    p += 1
+                    q += 1
+                if w == u or w == v:
+                    continue
+                if dyadic:
+                    stamps[w] = dyad
+                if u < w:
+                    count = _emit(directed_indptr, directed_indices, v, u, w, wanted,
+                                  count, fill, codes, out_a, out_b, out_c)
+                elif v < w and not neighbor_of_v:
+                    count = _emit(directed_indptr, directed_indices, v, w, u, wanted,
+                                  count, fill, codes, out_a, out_b, out_c)
+            if dyadic:
+                for w in range(n):
+                    if w == u or w == v or stamps[w] == dyad:
+                        continue
+                    if w < v:
+                        count = _emit(directed_indptr, directed_indices, w, v, u, wanted,
+                                      count, fill, codes, out_a, out_b, out_c)
+                    elif w < u:
+                        count = _emit(directed_indptr, directed_indices, v, w, u, wanted,
+                                      count, fill, codes, out_a, out_b, out_c)
+                    else:
+                        count = _emit(directed_indptr, directed_indices, v, u, w, wanted,
+                                      count, fill, codes, out_a, out_b, out_c)
+            dyad += 1
+    return count
+
+
+@njit(cache=True, nogil=True)
+def null_triads(indptr, indices, start, stop, fill, out_a, out_b, out_c):
+    """
+    Enumerate the triads without any edge whose lowest node is one of the
+    nodes ``start`` to ``stop - 1``, like connected_triads. O(n^3).
+    """
+    n = len(indptr) - 1
+    count = 0
+    for a in range(start, stop):
+        for b in range(a + 1, n):
+            if _has_edge(indptr, indices, a, b):
+                continue
+            for c in range(b + 1, n):
+                if _has_edge(indptr, indices, a, c) or _has_edge(indptr, indices, b, c):
+                    continue
+                if fill:
+                    out_a[count] = a
+                    out_b[count] = b
+                    out_c[count] = c
+                count += 1
+    return count
@@ -0,0 +1,134 @@
+import numpy as np
+
+from . import kernels
+
+# Number of node pairs whose adjacency rows are sliced out at once. Bounds the
+# size of the temporary sparse matrices independently of the candidate count.
+DEFAULT_CHUNK_SIZE = 2 ** 18
+
+# Execution backends of the pair statistics
+BACKENDS = ('scipy', 'numba')
+
+
+class PairNeighborhood:
+    """Neighbourhood statistics of a batch of node pairs.
+
+    Every statistic is computed for the whole batch in vectorized passes
+    over the CSR adjacency the first time it is requested and is kept, so
+    the similarity indices are cheap arithmetic on shared arrays.
+
+    adjacency: CSRAdjacency of an undirected graph
+    u, v: int32 arrays with the node positions of the pairs
+    backend: scipy -> chunked sparse-matrix products
+             numba -> compiled sorted-merge kernels (see kernels.py)
+    cache: optional GraphCache to share the statistics with other predictors
+        scoring the same batch (see fill_predictions)
+    key: key identifying adjacency and pairs in ``cache``
+    """
+
+    def __init__(self, adjacency, u, v, chunk_size=DEFAULT_CHUNK_SIZE,
+                 backend='scipy', cache=None, key=None):
+        if backend not in BACKENDS:
+            raise ValueError(
+                "Invalid value for `backend` ({0}), must be one of {1}"
+                .format(backend, BACKENDS)
+            )
+        self.adjacency = adjacency
+        self.u = u
+        self.v = v
+        self.chunk_size = chunk_size
+        self.backend = backend
+        self.cache = cache
+        self.key = key
+        self._statistics = {}
+
+    def __len__(self):
+        return len(self.u)
+
+    @property
+    def degrees_u(self):
+        return self._pair_degrees()[0]
+
+    @property
+    def degrees_v(self):
+        return self._pair_degrees()[1]
+
+    @property
+    def intersections(self):
+        """Number of common neighbours of each pair."""
+        return self._statistic(
+            'intersections', lambda: self._reduce_rows(None).astype(np.int64))
+
+    @property
+    def unions(self):
+        """Size of the union of both neighbourhoods of each pair.
+
+        A node with a self-loop is its own neighbour in networkx and
+        therefore part of the union unless it is already adjacent to the
+        other node of the pair.
+        """
+        row_lengths = np.diff(self.adjacency.indptr)
+        unions = row_lengths[self.u] + row_lengths[self.v] - self.intersections
+        self_loops = self.adjacency.self_loops
+        if self_loops.any():
+            loops = self_loops[self.u].astype(np.int64) + self_loops[self.v]
+            unions += loops * ~self.adjacent
+        return unions
+
+    @property
+    def adjacent(self):
+        """Whether the nodes of each pair are adjacent."""
+        return self._statistic('adjacent', self._compute_adjacent)
+
+    def weighted_intersections(self, name, node_weights):
+        """Sum of ``node_weights`` over the common neighbours of each pair.
+
+        name: designation of the weighting under which the sums are shared
+        """
+        return self._statistic(
+            f'intersections.{name}', lambda: self._reduce_rows(node_weights))
+
+    def _statistic(self, name, compute):
+        if name not in self._statistics:
+            if self.cache is None:
+                self._statistics[name] = compute()
+            else:
+                self._statistics[name] = self.cache.get((name, self.key), compute)
+        return self._statistics[name]
+
+    def _compute_adjacent(self):
+        matrix = self.adjacency.matrix
+        adjacent = np.empty(len(self), dtype=bool)
+        for start, stop in self._chunks():
+            rows = matrix[self.u[start:stop], self.v[start:stop]]
+            adjacent[start:stop] = np.asarray(rows).ravel() != 0
+        return adjacent
+
+    def _pair_degrees(self):
+        degrees = self.adjacency.degrees
+        if self.backend == 'numba':
+            return kernels.pair_degrees(degrees, self.u, self.v)
+        return degrees[self.u], degrees[self.v]
+
+    def _reduce_rows(self, node_weights):
+        if self.backend == 'numba':
+            indptr, indices = self.adjacency.indptr, self.adjacency.indices
+            if node_weights is None:
+                return kernels.intersection_counts(indptr, indices, self.u, self.v)
+            return kernels.weighted_intersection_sums(
+                indptr, indices, self.u, self.v, node_weights)
+
+        matrix = self.adjacency.matrix
+        result = np.zeros(len(self), dtype=np.float64)
+        for start, stop in self._chunks():
+            common = matrix[self.u[start:stop]].multiply(
+                matrix[self.v[start:stop]])
+            if node_weights is None:
+                result[start:stop] = np.asarray(common.sum(axis=1)).ravel()
+            else:
+                result[start:stop] = common.dot(node_weights)
+        return result
+
+    def _chunks(self):
+        for start in range(0, len(self), self.chunk_size):
+            yield start, min(start + self.chunk_size, len(self))
@@ -0,0 +1,175 @@
+"""
+Scoring of topology predictors on a process pool.
+
+The CSR adjacency of the graph and the node positions of the candidate
+pairs are published once per run through ``multiprocessing.shared_memory``
+instead of being pickled to every worker process. The workers score chunks
+of candidate pairs with all predictors at once, so neighbourhood statistics
+are still shared between the predictors of a chunk, and write the scores
+straight into a shared score matrix.
+"""
+import math
+import signal
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from .adjacency import CSRAdjacency, get_adjacency
+from .graph_cache import GraphCache
+from .neighborhood import PairNeighborhood
+from .predictor import DEFAULT_PREDICT_CHUNK_SIZE
+from .similarity_indices import BatchPredictor
+from .utility import fill_predictions
+
+# Alignment of the arrays within a shared memory block
+_ALIGNMENT = 64
+
+# Number of chunks per process; more chunks balance the load better
+_CHUNKS_PER_PROCESS = 4
+
+# Adjacencies and detached predictors of a pool worker (see _initialize)
+_groups = []
+
+
+class SharedArrays:
+    """NumPy arrays stored in one ``multiprocessing.shared_memory`` block.
+
+    The creating process publishes the arrays with ``publish`` and passes
+    ``handle`` to other processes, which map the same memory with
+    ``attach`` instead of receiving a copy.
+    """
+
+    def __init__(self, memory, layout, owner=False):
+        self.memory = memory
+        self.layout = layout
+        self.owner = owner
+        self.arrays = {
+            name: np.ndarray(shape, dtype=dtype, buffer=memory.buf, offset=offset)
+            for name, (offset, shape, dtype) in layout.items()
+        }
+
+    @classmethod
+    def publish(cls, arrays):
+        """Copy the arrays of a dict into a new shared memory block."""
+        layout = {}
+        size = 0
+        for name, array in arrays.items():
+            size = -(-size // _ALIGNMENT) * _ALIGNMENT
+            layout[name] = (size, array.shape, array.dtype.str)
+            size += array.nbytes
+        shared = cls(SharedMemory(create=True, size=max(size, 1)), layout, owner=True)
+        for name, array in arrays.items():
+            shared.arrays[name][...] = array
+        return shared
+
+    @classmethod
+    def attach(cls, handle):
+        name, layout = handle
+        return cls(SharedMemory(name=name), layout)
+
+    @property
+    def handle(self):
+        return (self.memory.name, self.layout)
+
+    def close(self):
+        self.arrays = {}
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+
+def fill_predictions_parallel(features, node_pairs, link_predictors, processes,
+                              chunk_size=DEFAULT_PREDICT_CHUNK_SIZE, progress=None):
+    """
+    Fill column ``i`` of ``features`` with the scores of ``link_predictors[i]``
+    for ``node_pairs``, like fill_predictions but on a pool of ``processes``
+    worker processes. Predictors that cannot be detached from their
+    networkx graph (see BatchPredictor.detach) are scored in this process.
+    The scores are identical to the sequential ones, and the requests of the
+    workers' chunk caches are added to the statistics of the predictors' cache.
+
+    progress: optional callable, called with the number of scores written
+        after every chunk (see fill_predictions)
+    """
+    groups = {}
+    caches = {}
+    for column, link_predictor in enumerate(link_predictors):
+        detached = None
+        if isinstance(link_predictor, BatchPredictor):
+            detached = link_predictor.detach()
+        if detached is None:
+            fill_predictions(features[:, column:column + 1], node_pairs, [link_predictor],
+                             chunk_size, progress)
+            continue
+        adjacency = get_adjacency(link_predictor.graph, link_predictor.cache)
+        group = groups.setdefault(adjacency.fingerprint, (adjacency, [], []))
+        group[1].append(column)
+        group[2].append(detached)
+        caches.setdefault(adjacency.fingerprint, link_predictor.cache)
+
+    if not groups or len(node_pairs) == 0:
+        return features
+
+    shared_groups = []
+    try:
+        for adjacency, columns, _ in groups.values():
+            u, v = adjacency.pair_indices(node_pairs)
+            shared_groups.append(SharedArrays.publish({
+                'indptr': adjacency.indptr,
+                'indices': adjacency.indices,
+                'self_loops': adjacency.self_loops,
+                'u': u,
+                'v': v,
+                'scores': np.zeros((len(columns), len(node_pairs)), dtype=features.dtype)
+            }))
+
+        run_caches = list(caches.values())
+        initargs = [(shared.handle, adjacency.directed, detached)
+                    for shared, (adjacency, _, detached)
+                    in zip(shared_groups, groups.values())]
+        task_size = min(chunk_size, max(1, math.ceil(
+            len(node_pairs) / (processes * _CHUNKS_PER_PROCESS))))
+        tasks = [(group, start, min(start + task_size, len(node_pairs)))
+                 for group in range(len(shared_groups))
+                 for start in range(0, len(node_pairs), task_size)]
+        with Pool(processes, initializer=_initialize, initargs=(initargs,)) as pool:
+            for group, count, hits, misses in pool.imap_unordered(_score_chunk, tasks):
+                run_caches[group].record(hits, misses)
+                if progress is not None:
+                    progress(count * len(shared_groups[group].arrays['scores']))
+
+        for shared, (_, columns, _) in zip(shared_groups, groups.values()):
+            features[:, columns] = shared.arrays['scores'].T
+    finally:
+        for shared in shared_groups:
+            shared.close()
+    return features
+
+
+def _initialize(groups):
+    # Terminating the pool must not unwind the predictor's SIGTERM handler
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    for handle, directed, predictors in groups:
+        shared = SharedArrays.attach(handle)
+        arrays = shared.arrays
+        adjacency = CSRAdjacency(range(len(arrays['indptr']) - 1), arrays['indptr'],
+                                 arrays['indices'], arrays['self_loops'], directed)
+        for predictor in predictors:
+            predictor.graph = adjacency
+        _groups.append((shared, adjacency, predictors))
+
+
+def _score_chunk(task):
+    group, start, stop = task
+    shared, adjacency, predictors = _groups[group]
+    arrays = shared.arrays
+    u, v = arrays['u'][start:stop], arrays['v'][start:stop]
+    # Statistics are shared between the predictors of the chunk only
+    cache = GraphCache()
+    for row, predictor in enumerate(predictors):
+        predictor.cache = cache
+        neighborhood = PairNeighborhood(adjacency, u, v, backend=predictor.backend,
+                                        cache=cache, key=(start, stop))
+        arrays['scores'][row, start:stop] = predictor.score(neighborhood)
+    return group, stop - start, cache.hits, cache.misses
@@ -0,0 +1,60 @@
+import numpy as np
+
+
+def shortest_path_lengths(adjacency, u, v, cutoff=None, unreachable=-1):
+    """
+    Unweighted shortest path lengths of node pairs.
+
+    The pairs are grouped by their source node and one breadth-first search
+    is run per distinct source, which stops as soon as all targets of the
+    source are reached or ``cutoff`` levels have been expanded.
+
+    adjacency: CSRAdjacency (directed adjacencies follow out-edges)
+    u, v: int arrays with the node positions of sources and targets
+    cutoff: maximum path length to search for (None for unlimited)
+    unreachable: length reported for pairs without a path within the cutoff
+
+    Returns an int64 array with one length per pair.
+    """
+    lengths = np.full(len(u), unreachable, dtype=np.int64)
+    if len(u) == 0:
+        return lengths
+
+    order = np.argsort(u, kind='stable')
+    sources, starts = np.unique(u[order], return_index=True)
+    stops = np.append(starts[1:], len(order))
+    distances = np.full(len(adjacency), -1, dtype=np.int64)
+    for source, start, stop in zip(sources, starts, stops):
+        positions = order[start:stop]
+        targets = v[positions]
+        visited = _breadth_first_search(adjacency, source, targets, cutoff, distances)
+        target_distances = distances[targets]
+        found = target_distances >= 0
+        lengths[positions[found]] = target_distances[found]
+        distances[visited] = -1
+    return lengths
+
+
+def _breadth_first_search(adjacency, source, targets, cutoff, distances):
+    """Level-synchronous BFS writing the hop distances into ``distances``.
+
+    Returns the visited nodes so that the caller can reset ``distances``.
+    """
+    indptr, indices = adjacency.indptr, adjacency.indices
+    frontier = np.array([source], dtype=np.int64)
+    distances[source] = 0
+    visited = [frontier]
+    depth = 0
+    while len(frontier) != 0 and (cutoff is None or depth < cutoff):
+        if (distances[targets] >= 0).all():
+            break
+        depth += 1
+        # Gather the neighbours of the whole frontier in one pass
+        starts = indptr[frontier]
+        counts = indptr[frontier + 1] - starts
+        offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+        neighbors = indices[offsets + np.arange(len(offsets))]
+        frontier = np.unique(neighbors[distances[neighbors] < 0])
+        distances[frontier] = depth
+        visited.append(frontier)
+    return np.concatenate(visited)
@@ -1,13 +1,33 @@
 from abc import ABC, abstractmethod
+
+import numpy as np
 from networkx import Graph
 
+from .graph_cache import GraphCache
+
+# Number of node pairs scored per chunk by predict_chunks
+DEFAULT_PREDICT_CHUNK_SIZE = 2 ** 18
+
 
 class LinkPredictor(ABC):
 
-    def __init__(self, graph: Graph):
+    def __init__(self, graph: Graph, cache: GraphCache = None):
         super().__init__()
         self.graph = graph
+        self.cache = cache if cache is not None else GraphCache()
 
     @abstractmethod
     def predict(self, node_pairs):
         pass
+
+    def predict_chunks(self, node_pairs, chunk_size=DEFAULT_PREDICT_CHUNK_SIZE):
+        """
+        Yield the scores of ``node_pairs`` as float64 arrays of at most
+        ``chunk_size`` consecutive pairs, so that callers only hold one chunk
+        of intermediate results at a time. Predictors scoring NumPy arrays
+        directly override this; the default wraps ``predict``.
+        """
+        for start in range(0, len(node_pairs), chunk_size):
+            prediction = self.predict(node_pairs[start:start + chunk_size])
+            yield np.fromiter((pred[2] for pred in prediction),
+                              dtype=np.float64, count=len(prediction))
@@ -1,318 +1,265 @@
-from math import sqrt
+import copy
+from abc import abstractmethod
+from itertools import chain
 
-from networkx import (
-    Graph, adamic_adar_index, common_neighbors, jaccard_coefficient,
-    preferential_attachment, resource_allocation_index, community,
-    shortest_path_length)
+import numpy as np
+from networkx import NetworkXNoPath, shortest_path_length
 
+from .adjacency import get_adjacency
+from .communities import detect_community_labels
+from .neighborhood import PairNeighborhood
+from .paths import shortest_path_lengths
 from .predictor import \
-    LinkPredictor
+    DEFAULT_PREDICT_CHUNK_SIZE, LinkPredictor
 
 
-class AdamicAdar(LinkPredictor):
+class BatchPredictor(LinkPredictor):
+    """Base class of the predictors that score node pairs in NumPy batches.
 
-    def predict(self, node_pairs):
-        predictions = adamic_adar_index(self.graph, node_pairs)
-        return list(predictions)
-
-    def __repr__(self):
-        return self.__str__()
-
-    def __str__(self):
-        return 'AdamicAdar'
+    The graph is converted to a CSR adjacency once and the node pairs are
+    scored chunk by chunk in vectorized passes over their neighbourhood
+    statistics instead of one networkx call per pair. Graph-level data (the
+    adjacency, communities, ...) is shared through the run's GraphCache, so
+    predictors on the same graph compute it only once.
+    """
 
+    def __init__(self, graph, backend='scipy', cache=None):
+        """
+        backend: execution backend of the neighbourhood statistics
+            (scipy or numba, see PairNeighborhood)
+        """
+        super().__init__(graph, cache)
+        self.backend = backend
 
-class AdjustedRand(LinkPredictor):
+    @property
+    def adjacency(self):
+        return get_adjacency(self.graph, self.cache)
 
     def predict(self, node_pairs):
-        predictions = []
-        for node_pair in node_pairs:
-            uNeighborhood = self.graph.neighbors(node_pair[0])
-            vNeighborhood = self.graph.neighbors(node_pair[1])
-            uNeighborhood = list(uNeighborhood)
-            vNeighborhood = list(vNeighborhood)
-            intersectionNeighbors = list(common_neighbors(self.graph, node_pair[0], node_pair[1]))
-            unionNeighbors = set().union(uNeighborhood, vNeighborhood)
-
-            a = len(intersectionNeighbors)
-            b = len(unionNeighbors)
-            c = len(unionNeighbors)
-            d = len(self.graph) - len(unionNeighbors)
-
-            denominator = ((a+b) * (b+d)) + ((a+c) * (c+d))
+        scores = chain.from_iterable(chunk.tolist()
+                                     for chunk in self.predict_chunks(node_pairs))
+        return [(node_pair[0], node_pair[1], score)
+                for node_pair, score in zip(node_pairs, scores)]
+
+    def predict_chunks(self, node_pairs, chunk_size=DEFAULT_PREDICT_CHUNK_SIZE):
+        adjacency = self.adjacency
+        for start in range(0, len(node_pairs), chunk_size):
+            stop = min(start + chunk_size, len(node_pairs))
+            u, v = adjacency.pair_indices(node_pairs[start:stop])
+            # The statistics of a chunk are not cached, so that memory stays
+            # bounded by the chunk size; fill_predictions shares them between
+            # the predictors of a run
+            neighborhood = PairNeighborhood(adjacency, u, v, backend=self.backend)
+            yield self.score(neighborhood)
+
+    def detach(self):
+        """
+        Return a copy of the predictor without graph and cache that can be
+        pickled to another process and scored there on the graph's CSR
+        adjacency alone (see parallel.py). State that needs the networkx
+        graph is computed beforehand. Returns None if the predictor cannot
+        be scored without the networkx graph.
+        """
+        detached = copy.copy(self)
+        detached.graph = None
+        detached.cache = None
+        return detached
+
+    @abstractmethod
+    def score(self, neighborhood):
+        pass
 
-            predictions.append((node_pair[0], node_pair[1], 2*(a*d - b*c) / denominator 
-                               if denominator != 0 else 0))
-        return predictions
-
-        def __repr__(self):
-            return self.__str__()
-
-        def __str__(self):
-            return 'AdjustedRand'
+    def __repr__(self):
+        return self.__str__()
 
+    def __str__(self):
+        return self.__class__.__name__
 
-class CommonNeighbors(LinkPredictor):
 
-    def predict(self, node_pairs):
-        predictions = [(node_pair[0], node_pair[1], 
-                       len(list(common_neighbors(self.graph, node_pair[0], node_pair[1]))))
-                       for node_pair in node_pairs]
-        return predictions
+def _ratio(numerator, denominator):
+    """Element-wise ``numerator / denominator`` with 0 where the denominator is 0."""
+    numerator = np.asarray(numerator, dtype=np.float64)
+    denominator = np.asarray(denominator, dtype=np.float64)
+    result = np.zeros(np.broadcast(numerator, denominator).shape)
+    np.divide(numerator, denominator, out=result, where=denominator != 0)
+    return result
 
-        def __repr__(self):
-            return self.__str__()
 
-        def __str__(self):
-            return 'CommonNeighbors'
+class AdamicAdar(BatchPredictor):
 
+    def score(self, neighborhood):
+        degrees = self.adjacency.degrees
+        # Common neighbours have a degree of at least 2
+        weights = _ratio(1, np.log(np.maximum(degrees, 1)))
+        return neighborhood.weighted_intersections('AdamicAdar', weights)
 
-class Jaccard(LinkPredictor):
 
-    def predict(self, node_pairs):
-        predictions = jaccard_coefficient(self.graph, node_pairs)
-        return list(predictions)
+class AdjustedRand(BatchPredictor):
 
-        def __repr__(self):
-            return self.__str__()
+    def score(self, neighborhood):
+        a = neighborhood.intersections
+        b = neighborhood.unions
+        c = b
+        d = len(self.adjacency) - b
 
-        def __str__(self):
-            return 'Jaccard'
+        denominator = ((a+b) * (b+d)) + ((a+c) * (c+d))
+        return _ratio(2 * (a*d - b*c), denominator)
 
 
-class Salton(LinkPredictor):
+class CommonNeighbors(BatchPredictor):
 
-    def predict(self, node_pairs):
-        predictions = []
-        for node_pair in node_pairs:
-            uNeighborhood = self.graph.degree(node_pair[0])
-            vNeighborhood = self.graph.degree(node_pair[1])
-            intersection = common_neighbors(self.graph, node_pair[0], node_pair[1])
-            intersection = len(list(intersection))
-            denominator = sqrt(uNeighborhood * vNeighborhood)
-            predictions.append((node_pair[0], node_pair[1], 
-                               intersection / denominator if denominator != 0 else 0))
-        return predictions
+    def score(self, neighborhood):
+        return neighborhood.intersections
 
-        def __repr__(self):
-            return self.__str__()
 
-        def __str__(self):
-            return 'Salton'
+class Jaccard(BatchPredictor):
 
+    def score(self, neighborhood):
+        return _ratio(neighborhood.intersections, neighborhood.unions)
 
-class PreferentialAttachement(LinkPredictor):
 
-    def predict(self, node_pairs):
-        predictions = preferential_attachment(self.graph, node_pairs)
-        return list(predictions)
+class Salton(BatchPredictor):
 
-        def __repr__(self):
-            return self.__str__()
+    def score(self, neighborhood):
+        denominator = np.sqrt(neighborhood.degrees_u * neighborhood.degrees_v)
+        return _ratio(neighborhood.intersections, denominator)
 
-        def __str__(self):
-            return 'PreferentialAttachement'
 
+class PreferentialAttachement(BatchPredictor):
 
-class ResourceAllocation(LinkPredictor):
+    def score(self, neighborhood):
+        return neighborhood.degrees_u * neighborhood.degrees_v
 
-    def predict(self, node_pairs):
-        predictions = resource_allocation_index(self.graph, node_pairs)
-        return list(predictions)
 
-        def __repr__(self):
-            return self.__str__()
+class ResourceAllocation(BatchPredictor):
 
-        def __str__(self):
-            return 'ResourceAllocation'
+    def score(self, neighborhood):
+        weights = _ratio(1, self.adjacency.degrees)
+        return neighborhood.weighted_intersections('ResourceAllocation', weights)
 
 
-class SameCommunity(LinkPredictor):
+class SameCommunity(BatchPredictor):
 
-    def __init__(self, graph, iterations: int = 1):
-        super().__init__(graph)
+    def __init__(self, graph, iterations: int = 1,
+                 community_detection='girvan_newman', seed=None, cache=None):
+        super().__init__(graph, cache=cache)
         if iterations < 1:
             raise ValueError('Invalid iterations value. It must be greater '
                              'than or equal to 1!')
         self.iterations = iterations
-
-    def predict(self, node_pairs):
-        communities_generator = community.girvan_newman(self.graph)
-        for i in range(self.iterations):
-            level_communities = next(communities_generator)
-
-        predictions = []
-        for node_pair in node_pairs:
-            uCommunityIndex = self._getCommunityIndex(node_pair[0], level_communities)
-            vCommunityIndex = self._getCommunityIndex(node_pair[1], level_communities)
-            predictions.append((node_pair[0], node_pair[1],
-                               1 if (uCommunityIndex == vCommunityIndex and uCommunityIndex != -1) else 0))
-        return predictions
-
-    def _getCommunityIndex(self, node, communities):
-        index = -1
-        for community in communities:
-            if node in community:
-                index = communities.index(community)
-        return index
-
-    def __repr__(self):
-        return self.__str__()
-
-    def __str__(self):
-        return 'SameCommunity'
-
-
-class ShortestPath(LinkPredictor):
-
-    def __init__(self, graph, method='dijkstra'):
-        super().__init__(graph)
+        self.community_detection = community_detection
+        self.seed = seed
+        self._labels = None
+
+    def detach(self):
+        labels = self._community_labels()
+        detached = super().detach()
+        detached._labels = labels
+        return detached
+
+    def score(self, neighborhood):
+        labels = self._community_labels()
+        u_labels = labels[neighborhood.u]
+        v_labels = labels[neighborhood.v]
+        return ((u_labels == v_labels) & (u_labels != -1)).astype(np.int64)
+
+    def _community_labels(self):
+        if self._labels is not None:
+            return self._labels
+        return detect_community_labels(
+            self.graph,
+            method=self.community_detection,
+            iterations=self.iterations,
+            seed=self.seed,
+            cache=self.cache
+        )
+
+
+class ShortestPath(BatchPredictor):
+
+    def __init__(self, graph, method='bfs', cutoff=None, unreachable=-1, cache=None):
+        """
+        method: bfs -> one breadth-first search per source node on the CSR
+            adjacency; any other value is passed to networkx'
+            shortest_path_length for every pair (e.g. dijkstra)
+        cutoff: maximum path length; longer paths count as unreachable
+        unreachable: score of pairs without a path (within the cutoff)
+        """
+        super().__init__(graph, cache=cache)
         self.method = method
-
-    def predict(self, node_pairs):
+        self.cutoff = cutoff
+        self.unreachable = unreachable
+
+    def detach(self):
+        return super().detach() if self.method == 'bfs' else None
+
+    def score(self, neighborhood):
+        if self.method == 'bfs':
+            return shortest_path_lengths(
+                self.adjacency, neighborhood.u, neighborhood.v,
+                cutoff=self.cutoff, unreachable=self.unreachable
+            )
+        nodes = self.adjacency.nodes
         try:
-            predictions = [(node_pair[0], node_pair[1],
-                           shortest_path_length(self.graph, node_pair[0], node_pair[1], method=self.method))
-                           for node_pair in node_pairs]
-        except Exception:
+            return np.array([
+                self._shortest_path_length(nodes[u], nodes[v])
+                for u, v in zip(neighborhood.u.tolist(), neighborhood.v.tolist())
+            ], dtype=np.int64)
+        except ValueError:
             raise ValueError('Error during shortest path calculation. Probably'
                              ', the method does not exist!')
-        return predictions
 
-    def __repr__(self):
-        return self.__str__()
-
-    def __str__(self):
-        return 'ShortestPath'
-
-
-class TotalNeighbors(LinkPredictor):
-
-    def predict(self, node_pairs):
-        predictions = []
-        for node_pair in node_pairs:
-            uNeighborhood = self.graph.neighbors(node_pair[0])
-            vNeighborhood = self.graph.neighbors(node_pair[1])
-            uNeighborhood = list(uNeighborhood)
-            vNeighborhood = list(vNeighborhood)
-            predictions.append((node_pair[0], node_pair[1],
-                               len(set().union(uNeighborhood, vNeighborhood))))
-        return predictions
-
-    def __repr__(self):
-        return self.__str__()
-
-    def __str__(self):
-        return 'TotalNeighbors'
-
-
-class UDegree(LinkPredictor):
-
-    def predict(self, node_pairs):
-        predictions = [(node_pair[0], node_pair[1], self.graph.degree(node_pair[0]))
-                       for node_pair in node_pairs]
-        return predictions
-
-    def __repr__(self):
-        return self.__str__()
+    def _shortest_path_length(self, u, v):
+        try:
+            length = shortest_path_length(self.graph, u, v, method=self.method)
+        except NetworkXNoPath:
+            return self.unreachable
+        if self.cutoff is not None and length > self.cutoff:
+            return self.unreachable
+        return length
 
-    def __str__(self):
-        return 'UDegree'
 
+class TotalNeighbors(BatchPredictor):
 
-class VDegree(LinkPredictor):
+    def score(self, neighborhood):
+        return neighborhood.unions
 
-    def predict(self, node_pairs):
-        predictions = [(node_pair[0], node_pair[1], self.graph.degree(node_pair[1]))
-                       for node_pair in node_pairs]
-        return predictions
 
-    def __repr__(self):
-        return self.__str__()
+class UDegree(BatchPredictor):
 
-    def __str__(self):
-        return 'VDegree'
+    def score(self, neighborhood):
+        return neighborhood.degrees_u
 
 
-class Sorensen(LinkPredictor):
+class VDegree(BatchPredictor):
 
-    def predict(self, node_pairs):
-        predictions = []
-        for node_pair in node_pairs:
-            uNeighborhood = self.graph.degree(node_pair[0])
-            vNeighborhood = self.graph.degree(node_pair[1])
-            intersection = common_neighbors(self.graph, node_pair[0], node_pair[1])
-            intersection = len(list(intersection))
-            denominator = uNeighborhood + vNeighborhood
-            predictions.append((node_pair[0], node_pair[1], 
-                               2 * intersection / denominator if denominator != 0 else 0))
-        return predictions
-
-        def __repr__(self):
-            return self.__str__()
+    def score(self, neighborhood):
+        return neighborhood.degrees_v
 
-        def __str__(self):
-            return 'Sorensen'
 
+class Sorensen(BatchPredictor):
 
-class HubPromoted(LinkPredictor):
+    def score(self, neighborhood):
+        denominator = neighborhood.degrees_u + neighborhood.degrees_v
+        return _ratio(2 * neighborhood.intersections, denominator)
 
-    def predict(self, node_pairs):
-        predictions = []
-        for node_pair in node_pairs:
-            uNeighborhood = self.graph.degree(node_pair[0])
-            vNeighborhood = self.graph.degree(node_pair[1])
-            intersection = common_neighbors(self.graph, node_pair[0], node_pair[1])
-            intersection = len(list(intersection))
-            denominator = min(uNeighborhood, vNeighborhood)
-            predictions.append((node_pair[0], node_pair[1], 
-                               2 * intersection / denominator if denominator != 0 else 0))
-        return predictions
 
-        def __repr__(self):
-            return self.__str__()
+class HubPromoted(BatchPredictor):
 
-        def __str__(self):
-            return 'HubPromoted'
+    def score(self, neighborhood):
+        denominator = np.minimum(neighborhood.degrees_u, neighborhood.degrees_v)
+        return _ratio(2 * neighborhood.intersections, denominator)
 
 
-class HubDepressed(LinkPredictor):
+class HubDepressed(BatchPredictor):
 
-    def predict(self, node_pairs):
-        predictions = []
-        for node_pair in node_pairs:
-            uNeighborhood = self.graph.degree(node_pair[0])
-            vNeighborhood = self.graph.degree(node_pair[1])
-            intersection = common_neighbors(self.graph, node_pair[0], node_pair[1])
-            intersection = len(list(intersection))
-            denominator = max(uNeighborhood, vNeighborhood)
-            predictions.append((node_pair[0], node_pair[1], 
-                               2 * intersection / denominator if denominator != 0 else 0))
-        return predictions
+    def score(self, neighborhood):
+        denominator = np.maximum(neighborhood.degrees_u, neighborhood.degrees_v)
+        return _ratio(2 * neighborhood.intersections, denominator)
 
-        def __repr__(self):
-            return self.__str__()
 
-        def __str__(self):
-            return 'HubDepressed'
+class LeichtHolmeNewman(BatchPredictor):
 
-
-class LeichtHolmeNewman(LinkPredictor):
-
-    def predict(self, node_pairs):
-        predictions = []
-        for node_pair in node_pairs:
-            uNeighborhood = self.graph.degree(node_pair[0])
-            vNeighborhood = self.graph.degree(node_pair[1])
-            intersection = common_neighbors(self.graph, node_pair[0], node_pair[1])
-            intersection = len(list(intersection))
-            denominator = uNeighborhood * vNeighborhood
-            predictions.append((node_pair[0], node_pair[1], 
-                               2 * intersection / denominator if denominator != 0 else 0))
-        return predictions
-
-        def __repr__(self):
-            return self.__str__()
-
-        def __str__(self):
-            return 'LeichtHolmeNewman'
+    def score(self, neighborhood):
+        denominator = neighborhood.degrees_u * neighborhood.degrees_v
+        return _ratio(2 * neighborhood.intersections, denominator)
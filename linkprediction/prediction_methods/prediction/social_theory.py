@@ -4,16 +4,32 @@ from operator import itemgetter
 import numpy as np
 import pandas as pd
 import networkx as nx
-from networkx.algorithms import community, structuralholes
 
 from .predictor import \
     LinkPredictor
 
 from linkprediction.database_connector import DatabaseConnector
-from linkprediction.graph_import.predicted_graph_handler import \
-    add_or_update_edge
+from linkprediction.graph_import.predicted_graph_handler import (
+    add_or_update_edge, add_or_update_edges)
 from linkprediction.prediction_methods.prediction import (
     homophilies, triads)
+from linkprediction.prediction_methods.prediction.communities import \
+    detect_communities
+from linkprediction.prediction_methods.prediction.adjacency import \
+    get_adjacency
+from linkprediction.prediction_methods.prediction.centrality import \
+    katz_centrality
+from linkprediction.prediction_methods.prediction.structural_holes import (
+    burt_constraint, constraint_with_edges)
+from linkprediction.prediction_methods.preparation.candidates import \
+    CandidatePairs
+
+# Triad types with a missing edge whose closure balances the triad
+BALANCE_THEORY_TRIADS = {'021C', '111D', '111U', '030C', '201', '120C', '210'}
+
+# Balance Theory method_specified of every triad code
+BALANCE_THEORY_METHODS = np.array([f'BalanceTheory.{triads.TRICODE_TO_NAME[code]}'
+                                   for code in range(64)])
 
 
 # ******************************************* #
@@ -23,24 +39,37 @@ from linkprediction.prediction_methods.prediction import (
 # * 1. Endogenous Actor Level: Structural Hole Theory
 class StructuralHoleTheory(LinkPredictor):
 
-    def __init__(self, graph: nx.DiGraph, predicted_graph: nx.DiGraph, percentile_constraints=10):
-        super().__init__(graph)
+    def __init__(self, graph: nx.DiGraph, predicted_graph: nx.DiGraph, percentile_constraints=10,
+                 community_detection='girvan_newman', iterations=1, seed=None, cache=None):
+        super().__init__(graph, cache)
         self.predicted_graph = predicted_graph
         self.precentile_constraints = percentile_constraints
+        self.community_detection = community_detection
+        self.iterations = iterations
+        self.seed = seed
 
     def predict(self, node_pairs):
         # kernighan_lin_bisection: Nur für ungerichtete Graphen
         # K-Clique: Erfordert k (smallest community)
         # Fluid Communities: Anzahl der Comm erfordert
-        # girvan_newman: Ist geeignet
+        # girvan_newman: Ist geeignet (Standard, für große Graphen zu langsam)
+        # label_propagation, greedy_modularity, louvain: Nahezu linear
 
         # Calculate constraints and replace nan values by 1
-        constraints = structuralholes.constraint(self.graph)
-        constraints_cleared = {key: (val if not np.isnan(val) else 1)
-                               for key, val in constraints.items()}
-
-        # Define all structural communities on the first level
-        communities = next(community.girvan_newman(self.graph))
+        constraints = burt_constraint(self.graph, cache=self.cache)
+        constraints_cleared = dict(zip(
+            get_adjacency(self.graph, self.cache).nodes,
+            np.where(np.isnan(constraints), 1, constraints).tolist()
+        ))
+
+        # Define all structural communities (girvan_newman: on the first level)
+        communities = detect_communities(
+            self.graph,
+            method=self.community_detection,
+            iterations=self.iterations,
+            seed=self.seed,
+            cache=self.cache
+        )
 
         # Define persons with lowest constraints for each community
         com_brokers = {}
@@ -67,13 +96,14 @@ class StructuralHoleTheory(LinkPredictor):
         # Define new constraints by combining top brokers from different communities
         # Create predicted edges that have lowest constraints
         for com_index, brokers in com_brokers.items():
+            possible_counterparts = self._get_combinations(com_brokers, com_index)
             for broker in brokers:
-                possible_counterparts = self._get_combinations(com_brokers, com_index)
                 results = self._get_combination_results(self.graph, broker, possible_counterparts)
-                if len(results) == 0:
+                if np.all(np.isnan(results)):
                     continue
-                chosen_counterpart = min(results, key=results.get)
-                if results[chosen_counterpart] < constraints_cleared[broker]:
+                chosen_index = np.nanargmin(results)
+                chosen_counterpart = possible_counterparts[chosen_index]
+                if results[chosen_index] < constraints_cleared[broker]:
                     add_or_update_edge(
                         graph=self.predicted_graph,
                         edge=(broker, chosen_counterpart),
@@ -93,22 +123,11 @@ class StructuralHoleTheory(LinkPredictor):
         return possible_counterparts
 
     def _get_combination_results(self, graph, broker, possible_counterparts):
-        combination_result = {}
-        for counterpart in possible_counterparts:
-            if graph.has_edge(broker, counterpart):
-                continue
-            graph.add_edge(broker, counterpart)
-            if len(graph[broker]) != 0:
-                constraint = sum(
-                    structuralholes.local_constraint(graph, broker, n)
-                    for n in set(nx.all_neighbors(graph, broker))
-                )
-            else:
-                # Constraint is not defined for isolated nodes
-                constraint = 1
-            combination_result[counterpart] = constraint
-            graph.remove_edge(broker, counterpart)
-        return combination_result
+        # Constraint of the broker after adding an edge to each counterpart,
+        # NaN for existing edges. The graph itself is not changed.
+        if len(possible_counterparts) == 0:
+            return np.zeros(0)
+        return constraint_with_edges(graph, broker, possible_counterparts, self.cache)
 
         def __repr__(self):
             return self.__str__()
@@ -146,32 +165,13 @@ class SocialExchangeTheory(LinkPredictor):
 # * 3. Endogenous Triadic Level: Balance Theory
 class EndogenousBalanceTheory(LinkPredictor):
 
-    def __init__(self, graph: nx.DiGraph, predicted_graph: nx.DiGraph):
-        super().__init__(graph)
+    def __init__(self, graph: nx.DiGraph, predicted_graph: nx.DiGraph, cache=None):
+        super().__init__(graph, cache)
         self.predicted_graph = predicted_graph
 
     def predict(self, node_pairs):
-        balance_theory_triads = triads.triadic_enumeration(
-            self.graph,
-            set(['021C', '111D', '111U', '030C', '201', '120C', '210'])
-        )
-        assesed_triads = set()
-        for triad_type, triad_list in balance_theory_triads.items():
-            for current_triad in triad_list:
-                current_triad_sorted = tuple(sorted(current_triad))
-                if current_triad_sorted not in assesed_triads:
-                    assesed_triads.add(current_triad_sorted)
-                    edges = triads.get_missing_edges_for_bt(
-                        self.graph.subgraph(current_triad)
-                        )
-                    for edge in edges:
-                        add_or_update_edge(
-                            self.predicted_graph,
-                            edge,
-                            'Endogenous Social Theory',
-                            f'BalanceTheory.{triad_type}',
-                            1.0
-                        )
+        _predict_balance_theory(self.graph, self.predicted_graph, 'Endogenous Social Theory',
+                                self.cache)
 
         def __repr__(self):
             return self.__str__()
@@ -180,11 +180,40 @@ class EndogenousBalanceTheory(LinkPredictor):
             return 'BalanceTheory'
 
 
+def _predict_balance_theory(graph, predicted_graph, method_name, cache, triad_filter=None):
+    """
+    Predict the missing edges of the balance-theory triads of a graph (see
+    triads.get_closing_edges) with a score of 1.0 each.
+
+    triad_filter: optional function of the node position arrays u, v and w
+        of triads returning a boolean mask of the triads to use
+    """
+    nodes = list(graph)
+    chunks = []
+    for codes, u, v, w in triads.iter_triads(graph, BALANCE_THEORY_TRIADS, cache=cache):
+        if triad_filter is not None:
+            keep = triad_filter(u, v, w)
+            codes, u, v, w = codes[keep], u[keep], v[keep], w[keep]
+        triad_index, sources, targets = triads.get_closing_edges(codes, u, v, w)
+        chunks.append((codes[triad_index], sources, targets))
+    if not chunks:
+        return
+    codes, sources, targets = (np.concatenate(arrays) for arrays in zip(*chunks))
+    add_or_update_edges(
+        predicted_graph,
+        CandidatePairs(nodes, sources, targets),
+        method_name,
+        BALANCE_THEORY_METHODS[codes].tolist(),
+        np.ones(len(sources))
+    )
+
+
 # * 4. Endogenous Global Level: Collective Action Theory
 class EndogenousCollectiveActionTheory(LinkPredictor):
 
-    def __init__(self, graph: nx.DiGraph, predicted_graph: nx.DiGraph, max_distance=3, percentile_centrality=80, precentile_distant_nodes=90):
-        super().__init__(graph)
+    def __init__(self, graph: nx.DiGraph, predicted_graph: nx.DiGraph, max_distance=3, percentile_centrality=80, precentile_distant_nodes=90,
+                 cache=None):
+        super().__init__(graph, cache)
         self.predicted_graph = predicted_graph
         self.max_distance = max_distance
         self.precentile_centrality = percentile_centrality
@@ -192,9 +221,10 @@ class EndogenousCollectiveActionTheory(LinkPredictor):
 
     def predict(self, node_pairs):
         # Calculate katz centrality for every node
-        # katz_centrality gives errors sometimes
-        # centrality = nx.katz_centrality(original_graph)
-        centrality = nx.katz_centrality_numpy(self.graph)
+        centrality = dict(zip(
+            get_adjacency(self.graph, self.cache).nodes,
+            katz_centrality(self.graph, self.cache).tolist()
+        ))
 
         # Order nodes by centrality
         centrality_ordered = {k: v for k, v in sorted(
@@ -395,41 +425,33 @@ class ResourceDependencyTheory(LinkPredictor):
 # * 7. Endogenous Triadic Level: Balance Theory
 class ExogenousBalanceTheory(LinkPredictor):
 
-    def __init__(self, graph: nx.DiGraph, predicted_graph: nx.DiGraph, threshold: float, weightings: dict):
-        super().__init__(graph)
+    def __init__(self, graph: nx.DiGraph, predicted_graph: nx.DiGraph, threshold: float, weightings: dict,
+                 cache=None):
+        super().__init__(graph, cache)
         self.predicted_graph = predicted_graph
         self.threshold = threshold
         self.weightings = weightings
 
     def predict(self, node_pairs):
-        balance_theory_triads = triads.triadic_enumeration(
-            self.graph,
-            set(['021C', '111D', '111U', '030C', '201', '120C', '210'])
-        )
-        assesed_triads = set()
-        for triad_type, triad_list in balance_theory_triads.items():
-            for current_triad in triad_list:
-                current_triad_sorted = tuple(sorted(current_triad))
-                if current_triad_sorted not in assesed_triads:
-                    assesed_triads.add(current_triad_sorted)
-                    u = self.graph.nodes[current_triad_sorted[0]]
-                    v = self.graph.nodes[current_triad_sorted[1]]
-                    w = self.graph.nodes[current_triad_sorted[2]]
-                    if not _get_similarity(u, v, self.weightings) > self.threshold \
-                        or not _get_similarity(v, w, self.weightings) > self.threshold \
-                            or not _get_similarity(u, w, self.weightings) > self.threshold:
-                        continue
-                    edges = triads.get_missing_edges_for_bt(
-                        self.graph.subgraph(current_triad)
-                    )
-                    for edge in edges:
-                        add_or_update_edge(
-                            self.predicted_graph,
-                            edge,
-                            'Exogenous Social Theory',
-                            f'BalanceTheory.{triad_type}',
-                            1.0
-                        )
+        nodes = list(self.graph)
+        similarities = {}
+
+        def is_similar(pair):
+            if pair not in similarities:
+                similarities[pair] = _get_similarity(self.graph.nodes[pair[0]],
+                                                     self.graph.nodes[pair[1]],
+                                                     self.weightings) > self.threshold
+            return similarities[pair]
+
+        def similar_triads(u, v, w):
+            similar = np.zeros(len(u), dtype=bool)
+            for k, triad in enumerate(zip(u.tolist(), v.tolist(), w.tolist())):
+                a, b, c = sorted(nodes[position] for position in triad)
+                similar[k] = is_similar((a, b)) and is_similar((b, c)) and is_similar((a, c))
+            return similar
+
+        _predict_balance_theory(self.graph, self.predicted_graph, 'Exogenous Social Theory',
+                                self.cache, similar_triads)
 
         def __repr__(self):
             return self.__str__()
@@ -441,8 +463,9 @@ class ExogenousBalanceTheory(LinkPredictor):
 # * 8. Endogenous Global Level: Collective Action Theory
 class ExogenousCollectiveActionTheory(LinkPredictor):
 
-    def __init__(self, graph: nx.DiGraph, predicted_graph: nx.DiGraph, threshold: float, weightings: dict, max_distance=3, percentile_centrality=80, precentile_distant_nodes=90):
-        super().__init__(graph)
+    def __init__(self, graph: nx.DiGraph, predicted_graph: nx.DiGraph, threshold: float, weightings: dict, max_distance=3, percentile_centrality=80, precentile_distant_nodes=90,
+                 cache=None):
+        super().__init__(graph, cache)
         self.predicted_graph = predicted_graph
         self.threshold = threshold
         self.weightings = weightings
@@ -451,26 +474,21 @@ class ExogenousCollectiveActionTheory(LinkPredictor):
         self.precentile_distant_nodes = precentile_distant_nodes
 
     def predict(self, node_pairs):
+        nodes = get_adjacency(self.graph, self.cache).nodes
         node_centralities = {}
-        graph_centralities = {}
-        subgraphs = {}
-        for u in self.graph.nodes:
+        similar_nodes = {}
+        for position, u in enumerate(nodes):
             u_node = self.graph.nodes[u]
-            subgraphs[u] = self.graph.copy()
-            for v in self.graph.nodes:
-                v_node = self.graph.nodes[v]
-                if u == v:
-                    continue
-                if _get_similarity(u_node, v_node, self.weightings) <= self.threshold:
-                    subgraphs[u].remove_node(v)
-            # Calculate katz centrality for u
-            # Order nodes by centrality
-            local_centrality_ordered = {k: v for k, v in sorted(
-                nx.katz_centrality(subgraphs[u]).items(),
-                key=itemgetter(1)
-            )}
-            graph_centralities[u] = local_centrality_ordered
-            node_centralities[u] = local_centrality_ordered[u]
+            # Nodes similar to u (and u itself) form the subgraph of u
+            similar = np.fromiter(
+                (v == u or _get_similarity(u_node, self.graph.nodes[v], self.weightings) > self.threshold
+                 for v in nodes),
+                dtype=bool, count=len(nodes)
+            )
+            similar_nodes[u] = np.packbits(similar)
+            # Calculate katz centrality for u, keeping only the value of u
+            centrality = katz_centrality(self.graph, self.cache, similar)
+            node_centralities[u] = centrality[np.count_nonzero(similar[:position])]
 
         # Order nodes by centrality
         global_centrality_ordered = {k: v for k, v in sorted(
@@ -492,8 +510,14 @@ class ExogenousCollectiveActionTheory(LinkPredictor):
 
         # Calculate shortest paths between nodes
         for central_node, centrality in most_central_nodes.items():
+            similar = np.unpackbits(similar_nodes[central_node], count=len(nodes)).astype(bool)
+            subgraph_nodes = [node for node, is_similar in zip(nodes, similar) if is_similar]
+            # Recomputed for the few most central nodes instead of kept for all
+            local_centrality = dict(zip(
+                subgraph_nodes, katz_centrality(self.graph, self.cache, similar).tolist()
+            ))
             shortest_paths = nx.single_source_shortest_path_length(
-                subgraphs[central_node].to_undirected(as_view=True),
+                self.graph.subgraph(subgraph_nodes).to_undirected(as_view=True),
                 central_node
             )
             # Remove paths with length 0 or 1
@@ -503,7 +527,7 @@ class ExogenousCollectiveActionTheory(LinkPredictor):
             if len(shortest_paths) == 0:
                 continue
             distant_nodes = {
-                key: graph_centralities[central_node][key] for key in shortest_paths.keys()
+                key: local_centrality[key] for key in shortest_paths.keys()
             }
             distant_nodes_ordered = {
                 k: v for k, v in sorted(distant_nodes.items(), key=itemgetter(1))
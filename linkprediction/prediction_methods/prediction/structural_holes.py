@@ -0,0 +1,140 @@
+import numpy as np
+from scipy.sparse import csr_matrix, diags
+
+from .adjacency import get_adjacency
+from .graph_cache import GraphCache
+
+
+def mutual_tie_strengths(graph, cache: GraphCache = None):
+    """
+    Return the tie weights of Burt's constraint for all nodes of a graph as
+    used by networkx.algorithms.structuralholes (unweighted):
+
+    weights: scipy CSR matrix M of the mutual weights a_uv + a_vu
+    strengths: scipy CSR matrix P of the proportional tie strengths, i.e.
+        M with every row divided by its sum
+    scale: float64 array of the row sums of M
+
+    Rows and columns follow the node order of the graph's CSR adjacency.
+    The matrices are built once per graph structure and cache.
+    """
+    if cache is None:
+        cache = GraphCache()
+    adjacency = get_adjacency(graph, cache)
+    return cache.get(
+        ('mutual_tie_strengths', adjacency.fingerprint),
+        lambda: _mutual_tie_strengths(adjacency)
+    )
+
+
+def _mutual_tie_strengths(adjacency):
+    ties = (adjacency.matrix + diags(adjacency.self_loops.astype(np.float64))).tocsr()
+    weights = (ties + ties.T).tocsr()
+    weights.sort_indices()
+    scale = np.asarray(weights.sum(axis=1)).ravel()
+    inverse_scale = np.divide(1.0, scale, out=np.zeros_like(scale), where=scale > 0)
+    strengths = csr_matrix(diags(inverse_scale) @ weights)
+    return weights, strengths, scale
+
+
+def burt_constraint(graph, cache: GraphCache = None):
+    """
+    Return Burt's constraint of all nodes of a graph as a float64 array in
+    the node order of the graph's CSR adjacency. It equals
+    networkx.algorithms.structuralholes.constraint (unweighted) within
+    floating point tolerance, including NaN for nodes without successors.
+
+    The constraint of node u is the sum of (P + P^2)_uv ** 2 over the
+    neighbours v of u (see mutual_tie_strengths). It is computed once per
+    graph structure and cache.
+    """
+    if cache is None:
+        cache = GraphCache()
+    adjacency = get_adjacency(graph, cache)
+    return cache.get(
+        ('burt_constraint', adjacency.fingerprint),
+        lambda: _burt_constraint(adjacency, *mutual_tie_strengths(graph, cache))
+    )
+
+
+def _burt_constraint(adjacency, weights, strengths, scale):
+    neighbors = weights.copy()
+    neighbors.data[:] = 1.0
+    local = (strengths + strengths @ strengths).multiply(neighbors)
+    constraints = np.asarray(local.multiply(local).sum(axis=1)).ravel()
+    # Like networkx, the constraint of nodes without successors is undefined
+    successors = np.diff(adjacency.indptr) + adjacency.self_loops
+    constraints[successors == 0] = np.nan
+    return constraints
+
+
+def constraint_with_edges(graph, node, counterparts, cache: GraphCache = None):
+    """
+    Return Burt's constraint of ``node`` in ``graph`` plus one new edge from
+    ``node`` to each of ``counterparts``, for all counterparts at once and
+    without changing the graph.
+
+    node: node of the graph
+    counterparts: sequence of nodes other than ``node``
+
+    Returns a float64 array aligned with ``counterparts``. Counterparts that
+    are already successors of ``node`` are NaN.
+
+    Only the rows of ``node`` and of the counterpart change with the new edge,
+    so the constraint is the current row of P + P^2 (see
+    mutual_tie_strengths) with closed-form corrections. These are sparse
+    products over the counterparts' ties to the neighbours of ``node``.
+    """
+    if cache is None:
+        cache = GraphCache()
+    adjacency = get_adjacency(graph, cache)
+    weights, strengths, scale = mutual_tie_strengths(graph, cache)
+    n = len(adjacency)
+    b = adjacency.node_index[node]
+    c = np.fromiter((adjacency.node_index[counterpart] for counterpart in counterparts),
+                    dtype=np.int64, count=len(counterparts))
+
+    # Mutual weight of a new edge: a_bc, or a_bc + a_cb in undirected graphs
+    delta = 1.0 if adjacency.directed else 2.0
+    neighbors = weights.indices[weights.indptr[b]:weights.indptr[b + 1]]
+    tie_weights = weights.data[weights.indptr[b]:weights.indptr[b + 1]]
+    row = np.zeros(n)
+    row[neighbors] = tie_weights
+    self_weight = row[b]
+    new_scale = scale[b] + delta
+
+    # s_b * (P^2)_b.
+    indirect = np.asarray((weights[b] @ strengths).todense()).ravel()
+    base = np.zeros(n)
+    base[neighbors] = tie_weights + indirect[neighbors]
+    if self_weight > 0:
+        base[neighbors] += self_weight * tie_weights * (1.0 / new_scale - 1.0 / scale[b])
+    is_neighbor = np.zeros(n)
+    is_neighbor[neighbors] = 1.0
+
+    counterpart_weights = weights[c]
+    tie = row[c]
+    counterpart_scale = scale[c]
+    old_strength = np.divide(tie, counterpart_scale, out=np.zeros_like(tie),
+                             where=counterpart_scale > 0)
+    kappa = (tie + delta) / (counterpart_scale + delta) - old_strength
+
+    linear = counterpart_weights @ base
+    quadratic = counterpart_weights.multiply(counterpart_weights) @ is_neighbor
+    total = base @ base + 2 * kappa * linear + kappa ** 2 * quadratic
+
+    # Exact terms of the new tie to the counterpart ...
+    counterpart_self = weights.diagonal()[c]
+    counterpart_base = np.where(is_neighbor[c] > 0, base[c], indirect[c])
+    generic = is_neighbor[c] * (counterpart_base + kappa * counterpart_self) ** 2
+    exact = (counterpart_base + kappa * counterpart_self + delta * (1 + self_weight / new_scale)) ** 2
+    total += exact - generic
+    # ... and of the self-loop of the node
+    if self_weight > 0:
+        generic = (base[b] + kappa * tie) ** 2
+        exact = (base[b] + kappa * tie + delta * (tie + delta) / (counterpart_scale + delta)) ** 2
+        total += exact - generic
+
+    constraints = total / new_scale ** 2
+    constraints[np.isin(c, adjacency.neighbors(b))] = np.nan
+    return constraints
@@ -10,15 +10,25 @@
 # NetworkX is distributed under a BSD license; see LICENSE.txt for more
 # information.
 """Functions for analyzing triads of a graph."""
-import itertools
 from networkx.utils import not_implemented_for
 import networkx as nx
+import numpy as np
+
+from .adjacency import get_adjacency
+from .graph_cache import GraphCache
+from .kernels import connected_triads, null_triads
 
 __author__ = '\n'.join(['Alex Levenson (alex@isnontinvain.com)',
                         'Diederik van Liere (diederik.vanliere@rotman.utoronto.ca)'])
 
 __all__ = ['triadic_census']
 
+# Upper bound of the number of triads per chunk of iter_triads
+DEFAULT_CHUNK_SIZE = 2 ** 20
+
+# Triads with less than two connected dyads; see iter_triads
+SPARSE_TRIADS = ('003', '012', '102')
+
 #: The integer codes representing each type of triad.
 #:
 #: Triads that are the same up to symmetry have the same code.
@@ -36,6 +46,23 @@ TRIAD_NAMES = ('003', '012', '102', '021D', '021U', '021C', '111D', '111U',
 #: A dictionary mapping triad code to triad name.
 TRICODE_TO_NAME = {i: TRIAD_NAMES[code - 1] for i, code in enumerate(TRICODES)}
 
+#: The ordered node pairs of a triad (v, u, w), as positions 0 to 2, in the
+#: bit order of the codes of :func:`_tricode`.
+TRIAD_DYADS = ((0, 1), (1, 0), (0, 2), (2, 0), (1, 2), (2, 1))
+
+
+def _closing_dyads(code):
+    edges = {dyad for bit, dyad in enumerate(TRIAD_DYADS) if code & (1 << bit)}
+    return [dyad not in edges and any((dyad[0], third) in edges and (third, dyad[1]) in edges
+                                      for third in range(3) if third not in dyad)
+            for dyad in TRIAD_DYADS]
+
+
+#: Boolean table of the missing edges that close a path of two edges
+#: (see get_missing_edges_for_bt), with one row per triad code and one
+#: column per node pair of :data:`TRIAD_DYADS`.
+CLOSING_EDGES = np.array([_closing_dyads(code) for code in range(64)])
+
 
 def _tricode(G, v, u, w):
     """Returns the integer code of the given triad.
@@ -50,6 +77,88 @@ def _tricode(G, v, u, w):
     return sum(x for u, v, x in combos if v in G[u])
 
 
+@not_implemented_for('undirected')
+def iter_triads(G, triads=None, chunk_size=DEFAULT_CHUNK_SIZE, cache: GraphCache = None):
+    """
+    Yield the triads of a directed graph in chunks of NumPy arrays
+    ``(codes, u, v, w)``: the uint8 tricodes (see _tricode and
+    TRICODE_TO_NAME) of the triads and the int32 positions u < v < w of
+    their nodes in list(G). The tricode treats u, v and w as the ``v``,
+    ``u`` and ``w`` of _tricode.
+
+    triads: names of the triad types to yield, defaults to all types. The
+        triad types without two connected dyads ('003', '012' and '102')
+        are only enumerated if requested: the number of these triads grows
+        with n^3 (003) or with n per edge (012, 102) in sparse graphs.
+    chunk_size: upper bound of the number of triads per chunk, a chunk holds
+        at least the triads of one node
+
+    Every triad is yielded once. The connected triads are found in
+    O(m * max degree) by the algorithm of Batagelj and Mrvar on the CSR
+    adjacency of G, which is built once per graph and cache.
+    """
+    if triads is None:
+        triads = set(TRIAD_NAMES)
+    for triad in triads:
+        if triad not in TRIAD_NAMES:
+            raise ValueError(
+                "Invalid value for `triads` ({0}), must be one of {1}"
+                .format(triad, TRIAD_NAMES)
+            )
+    if cache is None:
+        cache = GraphCache()
+    adjacency = get_adjacency(G, cache, directed=False)
+    directed = get_adjacency(G, cache, directed=True)
+    indptr, indices = adjacency.indptr, adjacency.indices
+    n = len(adjacency)
+
+    wanted = np.array([TRICODE_TO_NAME[code] in triads for code in range(64)])
+    dyadic = bool({'012', '102'} & set(triads))
+    if wanted[1:].any():
+        # Upper bound of the triads of each row: the merged neighbourhoods
+        # of its dyads, plus every other node for dyadic triads
+        degrees = np.diff(indptr)
+        sources = np.repeat(np.arange(n), degrees)
+        dyads = indices > sources
+        work = degrees[sources[dyads]] + degrees[indices[dyads]] + (n if dyadic else 0)
+        row_work = np.bincount(sources[dyads], weights=work, minlength=n)
+        for start, stop in _row_chunks(row_work, chunk_size):
+            count = connected_triads(indptr, indices, directed.indptr, directed.indices,
+                                     start, stop, wanted, dyadic, False,
+                                     *_triad_arrays(0))
+            if count:
+                codes, u, v, w = _triad_arrays(count)
+                connected_triads(indptr, indices, directed.indptr, directed.indices,
+                                 start, stop, wanted, dyadic, True, codes, u, v, w)
+                yield codes, u, v, w
+
+    if wanted[0]:
+        remaining = np.arange(n - 1, -1, -1, dtype=np.float64)
+        for start, stop in _row_chunks(remaining * (remaining - 1) / 2, chunk_size):
+            count = null_triads(indptr, indices, start, stop, False, *_triad_arrays(0)[1:])
+            if count:
+                codes, u, v, w = _triad_arrays(count)
+                null_triads(indptr, indices, start, stop, True, u, v, w)
+                yield codes, u, v, w
+
+
+def _row_chunks(row_work, chunk_size):
+    """Split rows into consecutive ranges of at most ``chunk_size`` work (or one row)."""
+    cumulative = np.cumsum(row_work)
+    n = len(row_work)
+    start, done = 0, 0.0
+    while start < n:
+        stop = int(np.searchsorted(cumulative, done + chunk_size, side='right'))
+        stop = min(max(stop, start + 1), n)
+        yield start, stop
+        start, done = stop, cumulative[stop - 1]
+
+
+def _triad_arrays(count):
+    return (np.zeros(count, dtype=np.uint8), np.empty(count, dtype=np.int32),
+            np.empty(count, dtype=np.int32), np.empty(count, dtype=np.int32))
+
+
 @not_implemented_for('undirected')
 def triadic_enumeration(G, triads: set([])):
     """Determines the triadic enumeration of a directed graph.
@@ -68,12 +177,15 @@ def triadic_enumeration(G, triads: set([])):
 
     Notes
     -----
-    This algorithm has complexity $O(m)$ where $m$ is the number of edges in
-    the graph.
+    The triads are collected from iter_triads, whose arrays are better
+    suited for large graphs. The occurrences of every type match
+    networkx.triadic_census. In particular, '003' holds the triads without
+    any edge; before, it held all triads not found for the other requested
+    types.
 
     See also
     --------
-    triad_graph
+    iter_triads
 
     References
     ----------
@@ -88,48 +200,32 @@ def triadic_enumeration(G, triads: set([])):
     for triad in triads:
         if triad not in TRIAD_NAMES:
             return None
-    #: A dictionary mapping triad code to triad name.
-    TRICODE_TO_NAME = {i: TRIAD_NAMES[code - 1]
-                       for i, code in enumerate(TRICODES)}
 
+    nodes = list(G)
     triad_nodes = {name: set([]) for name in triads}
-    m = {v: i for i, v in enumerate(G)}
-    for v in G:
-        vnbrs = set(G.pred[v]) | set(G.succ[v])
-        for u in vnbrs:
-            if m[u] > m[v]:
-                unbrs = set(G.pred[u]) | set(G.succ[u])
-                neighbors = (vnbrs | unbrs) - {u, v}
-                not_neighbors = set(G.nodes()) - neighbors - {u, v}
-                # Find dyadic triads
-                if bool(set(['102', '012']).intersection(triads)):
-                    for w in not_neighbors:
-                        if v in G[u] and u in G[v] and '102' in triads:
-                            triad_nodes['102'].add(tuple(sorted([u, v, w])))
-                        elif '012' in triads:
-                            triad_nodes['012'].add(tuple(sorted([u, v, w])))
-                for w in neighbors:
-                    code = _tricode(G, v, u, w)
-                    current_triad = TRICODE_TO_NAME[code]
-                    if current_triad in triads and (
-                        m[u] < m[w] or (m[v] < m[w] < m[u] and
-                                        v not in G.pred[w] and
-                                        v not in G.succ[w])
-                    ):
-                        triad_nodes[current_triad].add(
-                            tuple(sorted([u, v, w]))
-                        )
-    if '003' in triads:
-        # find null triads
-        all_tuples = set()
-        for s in triad_nodes.values():
-            all_tuples = all_tuples.union(s)
-        triad_nodes['003'] = set(
-            itertools.combinations(G.nodes(), 3)
-        ).difference(all_tuples)
+    for codes, u, v, w in iter_triads(G, triads):
+        for code, a, b, c in zip(codes.tolist(), u.tolist(), v.tolist(), w.tolist()):
+            triad_nodes[TRICODE_TO_NAME[code]].add(
+                tuple(sorted([nodes[a], nodes[b], nodes[c]]))
+            )
     return triad_nodes
 
 
+def get_closing_edges(codes, u, v, w):
+    """
+    Get the missing edges for balance theory of many triads at once, as
+    returned by iter_triads, like get_missing_edges_for_bt for each triad.
+
+    Returns the int64 index of the triad of each edge and int32 source and
+    target node positions, ordered by triad.
+    """
+    triad_index, dyad = np.nonzero(CLOSING_EDGES[codes])
+    positions = np.stack([u, v, w])
+    dyads = np.array(TRIAD_DYADS)[dyad]
+    return (triad_index, positions[dyads[:, 0], triad_index],
+            positions[dyads[:, 1], triad_index])
+
+
 def get_missing_edges_for_bt(subgraph: nx.DiGraph):
     """Get missing edge for balance theory."""
     edges = []
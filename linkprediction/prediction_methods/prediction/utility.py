@@ -3,6 +3,12 @@ import pandas as pd
 from functools import partial
 from networkx import Graph
 
+from .adjacency import get_adjacency
+from .graph_cache import GraphCache
+from .neighborhood import PairNeighborhood
+from .predictor import DEFAULT_PREDICT_CHUNK_SIZE
+from .similarity_indices import BatchPredictor
+
 
 def get_predictions(node_pairs, *link_predictors):
     return [get_prediction(node_pairs, link_predictor) for link_predictor in link_predictors]
@@ -12,6 +18,73 @@ def get_prediction(node_pairs, link_predictor):
     return link_predictor.predict(node_pairs)
 
 
+def allocate_feature_matrix(node_pairs, link_predictors):
+    """
+    Return an uninitialised float32 matrix with one row per node pair and
+    one column per predictor. Columns are contiguous (Fortran order), so
+    fill_prediction writes each predictor's scores sequentially.
+    """
+    return np.empty((len(node_pairs), len(link_predictors)), dtype=np.float32, order='F')
+
+
+def fill_prediction(out, node_pairs, link_predictor, chunk_size=DEFAULT_PREDICT_CHUNK_SIZE):
+    """
+    Stream the scores of ``link_predictor`` for ``node_pairs`` chunk by chunk
+    into the array ``out`` (e.g. a column of allocate_feature_matrix). Only
+    one chunk of intermediate results is held at a time.
+    """
+    start = 0
+    for scores in link_predictor.predict_chunks(node_pairs, chunk_size):
+        stop = start + len(scores)
+        out[start:stop] = scores
+        start = stop
+    return out
+
+
+def fill_predictions(features, node_pairs, link_predictors, chunk_size=DEFAULT_PREDICT_CHUNK_SIZE,
+                     progress=None):
+    """
+    Fill column ``i`` of ``features`` with the scores of ``link_predictors[i]``
+    for ``node_pairs``. The node pairs are visited chunk by chunk once, and
+    the BatchPredictors on the same graph score each chunk against one
+    chunk-local GraphCache, like the workers of fill_predictions_parallel.
+    The neighbourhood statistics of a chunk are therefore computed once for
+    all predictors and released with the chunk. The requests of the chunk
+    caches are added to the statistics of the predictors' cache.
+
+    progress: optional callable, called with the number of scores written
+        after every chunk of every predictor
+    """
+    groups = {}
+    others = []
+    for column, link_predictor in enumerate(link_predictors):
+        if not isinstance(link_predictor, BatchPredictor):
+            others.append((column, link_predictor.predict_chunks(node_pairs, chunk_size)))
+            continue
+        adjacency = get_adjacency(link_predictor.graph, link_predictor.cache)
+        group = groups.setdefault(adjacency.fingerprint, (adjacency, [], []))
+        group[1].append(column)
+        group[2].append(link_predictor)
+
+    for start in range(0, len(node_pairs), chunk_size):
+        stop = min(start + chunk_size, len(node_pairs))
+        for adjacency, columns, predictors in groups.values():
+            u, v = adjacency.pair_indices(node_pairs[start:stop])
+            cache = GraphCache()
+            for column, predictor in zip(columns, predictors):
+                neighborhood = PairNeighborhood(adjacency, u, v, backend=predictor.backend,
+                                                cache=cache, key=(start, stop))
+                features[start:stop, column] = predictor.score(neighborhood)
+                if progress is not None:
+                    progress(stop - start)
+            predictors[0].cache.record(cache.hits, cache.misses)
+        for column, chunks in others:
+            features[start:stop, column] = next(chunks)
+            if progress is not None:
+                progress(stop - start)
+    return features
+
+
 def get_dataframe(predictions, predictor_names, with_node_pairs=False):
     df = pd.DataFrame()
     for prediction, predictor_name in zip(predictions, predictor_names):
@@ -1,4 +1,7 @@
+import logging
+import multiprocessing
 import os
+import signal
 import sys
 from collections import Counter
 from functools import partial
@@ -19,15 +22,21 @@ from linkprediction.graph_import.predicted_graph_handler import \
 from linkprediction.prediction_methods.preparation.preprocessing import \
     preprocess_df
 from linkprediction.prediction_methods.preparation.utility import \
-    assign_labels
-from linkprediction.prediction_methods.preparation.sampling import (
-    find_all_missing_edges, sampling_by_percentage)
+    label_candidates
+from linkprediction.prediction_methods.preparation.sampling import \
+    sampling_by_percentage
+from linkprediction.prediction_methods.preparation.candidates import (
+    CandidatePairs, generate_candidates)
 from linkprediction.prediction_methods.prediction.utility import (
-    get_prediction, get_dataframe)
+    allocate_feature_matrix, fill_predictions)
+from linkprediction.prediction_methods.prediction.parallel import \
+    fill_predictions_parallel
 from linkprediction.prediction_methods.prediction.classification import (
     get_X_y)
 from linkprediction.prediction_methods.predictor_factory import \
     LinkPredictorFactory
+from linkprediction.prediction_methods.prediction.graph_cache import \
+    GraphCache
 from linkprediction.prediction_methods.prediction_monitor import \
     PredictionMonitor
 from linkprediction.prediction_methods.prediction.social_theory import \
@@ -35,8 +44,17 @@ from linkprediction.prediction_methods.prediction.social_theory import \
 from linkprediction.prediction_methods.evaluation.metrics import (
     ROC, AUC, get_metrics_as_json)
 from linkprediction.graph_import.predicted_graph_handler import (
-    save_predicted_graph_to_db, get_st_features_from_predicted_graph, 
-    add_or_update_edge, hierarchical_to_flat, flat_to_hierarchical)
+    PredictedEdges, save_predicted_graph_to_db, get_st_features,
+    align_st_features, add_or_update_edges, hierarchical_to_flat, flat_to_hierarchical,
+    hierarchical_to_flat_structure, hierarchical_view)
+
+# Minimum predicted probability for a classifier to add an edge to the
+# predicted graph, unless the classifier's parameters define a `cutoff`
+DEFAULT_CLASSIFIER_CUTOFF = 0.5
+
+
+def _exit_on_sigterm(signum, frame):
+    raise SystemExit(128 + signum)
 
 
 class PredictionWorker(object):
@@ -49,7 +67,12 @@ class PredictionWorker(object):
                  preprocessing,
                  train_split,
                  test_split,
-                 seed):
+                 seed,
+                 processes=1,
+                 candidate_strategy='all',
+                 negative_ratio=1.0,
+                 max_distance=2,
+                 skip_visualization=False):
         self.process_id = process_id
         self.project_id = project_id
         self.predictors = predictors
@@ -58,27 +81,40 @@ class PredictionWorker(object):
         self.train_split = train_split
         self.test_split = test_split
         self.seed = seed
+        self.processes = processes
+        self.candidate_strategy = candidate_strategy
+        self.negative_ratio = negative_ratio
+        self.max_distance = max_distance
+        self.skip_visualization = skip_visualization
+        self.rng = np.random.default_rng(seed)
         self.monitor = PredictionMonitor(self, self._get_tasks())
-        self.factory = LinkPredictorFactory()
+        self.logger = logging.getLogger('prediction_worker')
+        self.cache = GraphCache()
+        self.factory = LinkPredictorFactory(self.cache, seed)
 
     def predict(self):
+        if multiprocessing.parent_process() is not None:
+            # Aborting a prediction terminates its process. Unwinding instead of
+            # dying immediately terminates the process pool and releases its
+            # shared memory (see fill_predictions_parallel).
+            signal.signal(signal.SIGTERM, _exit_on_sigterm)
         try:
             self.monitor.pending()
 
             # PIPELINE - PREPARATION
             ground_truth_graph_h = build_original_graph('project_id', self.project_id, 'hierarchical')
-            ground_truth_graph_f = hierarchical_to_flat(ground_truth_graph_h)
+            ground_truth_graph_f = self._to_flat(ground_truth_graph_h)
             train_graph_f, test_graph_f = self._sample_graphs(ground_truth_graph_f)
             train_missing_edges, test_missing_edges = self._get_missing_edges(ground_truth_graph_f, train_graph_f, test_graph_f)
             train_set, test_set = self._prepare_labels(ground_truth_graph_f, test_graph_f, train_missing_edges, test_missing_edges)
 
-            train_graph_h = flat_to_hierarchical(train_graph_f)
-            predicted_graph_train = train_graph_h.copy()
+            train_graph_h = hierarchical_view(train_graph_f)
+            predicted_graph_train = PredictedEdges(train_graph_f)
             test_graph_h = None
             predicted_graph_test = None
             if self.validation:
-                test_graph_h = flat_to_hierarchical(test_graph_f)
-                predicted_graph_test = test_graph_h.copy()
+                test_graph_h = hierarchical_view(test_graph_f)
+                predicted_graph_test = PredictedEdges(test_graph_f)
 
             # PIPELINE - TOPOLOGY
             train_t_df, test_t_df = self._topology_pipeline(ground_truth_graph_f, train_graph_f, test_graph_f, train_set, test_set)     
@@ -95,17 +131,17 @@ class PredictionWorker(object):
             train_c_df, test_c_df = self._classification_pipeline(train_features_df, test_features_df)
 
             # CREATE PREDICTED GRAPH
-            self._add_topology_to_predicted_graph(train_t_df, test_t_df, predicted_graph_train, predicted_graph_test)
-            self._add_classification_to_predicted_graph(train_set.node_pairs, train_c_df, test_c_df, predicted_graph_train, predicted_graph_test)
-            train_final = pd.concat([train_set.node_pairs, train_c_df], axis=1)
-            train_final = pd.concat([train_set.label, train_final], axis=1)
+            if not self.skip_visualization:
+                self._add_topology_to_predicted_graph(train_t_df, test_t_df, train_set, test_set, predicted_graph_train, predicted_graph_test)
+                self._add_classification_to_predicted_graph(train_set, test_set, train_c_df, test_c_df, predicted_graph_train, predicted_graph_test)
+            train_final = pd.concat([self._label_df(train_set), train_c_df], axis=1)
 
             test_final = None
             if not test_c_df is None:
-                test_final = pd.concat([test_set.node_pairs, test_c_df], axis=1)
-                test_final = pd.concat([test_set.label, test_final], axis=1)
+                test_final = pd.concat([self._label_df(test_set), test_c_df], axis=1)
 
-            self._save_predicted_graph(predicted_graph_train, predicted_graph_test)
+            if not self.skip_visualization:
+                self._save_predicted_graph(predicted_graph_train, predicted_graph_test, train_graph_f, test_graph_f)
 
             # PIPELINE - EVALUATION
             results_train, results_test = self._create_results(
@@ -162,7 +198,8 @@ class PredictionWorker(object):
                 name = f'Predict {predictor_name}'
                 tasks.append({'name': name})
 
-        tasks.append({'name': 'Create predicted graph'})
+        if not self.skip_visualization:
+            tasks.append({'name': 'Create predicted graph'})
         tasks.append({'name': 'Create evaluation results'})
 
         return tasks
@@ -171,6 +208,12 @@ class PredictionWorker(object):
     # Pipeline - Preparation             #
     ######################################
 
+    def _to_flat(self, graph):
+        # Without visualization, edge attributes and components are not needed
+        if self.skip_visualization:
+            return hierarchical_to_flat_structure(graph)
+        return hierarchical_to_flat(graph)
+
     def _sample_graphs(self, ground_truth_graph):
         self.monitor.notify('Processing')
 
@@ -178,11 +221,11 @@ class PredictionWorker(object):
         if self.validation:
             test_ratio = self.test_split
             train_ratio = self.train_split
-            test_graph = sampling_by_percentage(ground_truth_graph, test_ratio)
-            train_graph = sampling_by_percentage(test_graph, train_ratio)
+            test_graph = sampling_by_percentage(ground_truth_graph, test_ratio, self.rng)
+            train_graph = sampling_by_percentage(test_graph, train_ratio, self.rng)
         else:
             train_ratio = self.train_split
-            train_graph = sampling_by_percentage(ground_truth_graph, train_ratio)
+            train_graph = sampling_by_percentage(ground_truth_graph, train_ratio, self.rng)
 
         self.monitor.notify('Finished')
         return (train_graph, test_graph)
@@ -192,24 +235,43 @@ class PredictionWorker(object):
 
         train_missing_edges, test_missing_edges = None, None
         if self.validation:
-            train_missing_edges = find_all_missing_edges(train_graph)
-            test_missing_edges = find_all_missing_edges(test_graph)
+            train_missing_edges = self._find_candidates(train_graph, test_graph)
+            test_missing_edges = self._find_candidates(test_graph, ground_truth_graph)
         else:
-            train_missing_edges = find_all_missing_edges(train_graph)
+            train_missing_edges = self._find_candidates(train_graph, ground_truth_graph)
 
         self.monitor.notify('Finished')
         return (train_missing_edges, test_missing_edges)
 
+    def _find_candidates(self, graph, label_graph):
+        u, v = generate_candidates(
+            graph,
+            strategy=self.candidate_strategy,
+            label_graph=label_graph,
+            ratio=self.negative_ratio,
+            seed=self.rng,
+            max_distance=self.max_distance
+        )
+        return (list(graph), u, v)
+
     def _prepare_labels(self, ground_truth_graph, test_graph, train_missing_edges, test_missing_edges):
         train_set, test_set = None, None
         if self.validation:
-            train_set = assign_labels(train_missing_edges, test_graph)
-            test_set = assign_labels(test_missing_edges, ground_truth_graph)
+            train_set = self._label_candidates(train_missing_edges, test_graph)
+            test_set = self._label_candidates(test_missing_edges, ground_truth_graph)
         else:
-            train_set = assign_labels(train_missing_edges, ground_truth_graph)
+            train_set = self._label_candidates(train_missing_edges, ground_truth_graph)
 
         return (train_set, test_set)
 
+    def _label_candidates(self, candidates, graph):
+        nodes, u, v = candidates
+        u, v, labels = label_candidates(nodes, u, v, graph)
+        return CandidatePairs(nodes, u, v, labels)
+
+    def _label_df(self, candidates):
+        return pd.DataFrame({'label': candidates.label})
+
     ######################################
     # Pipeline - Topology                #
     ######################################
@@ -245,72 +307,89 @@ class PredictionWorker(object):
                 if predictor['feature_type'] == "Topology"]
 
     def _calculate_topology_features(self, train_predictors, test_predictors, train_set, test_set):
-        train_features, test_features = None, None
+        if self.processes > 1 and len(train_predictors) > 0:
+            return self._calculate_topology_features_parallel(train_predictors, test_predictors, train_set, test_set)
+
+        # All predictors are scored together chunk by chunk, see fill_predictions
+        progress = self._topology_progress(train_predictors, train_set, test_set)
+        test_features = None
+        train_features = allocate_feature_matrix(train_set, train_predictors)
+        fill_predictions(train_features, train_set, train_predictors, progress=progress)
         if self.validation:
-            train_node_pairs = train_set.node_pairs.values
-            test_node_pairs = test_set.node_pairs.values
-            train_features = []
-            test_features = []
-            for train_predictor, test_predictor in zip(train_predictors, test_predictors):
-                self.monitor.notify('Processing')
-                train_features.append(get_prediction(train_node_pairs, train_predictor))
-                test_features.append(get_prediction(test_node_pairs, test_predictor))
-                self.monitor.notify('Finished')
-        else:
-            train_node_pairs = train_set.node_pairs.values
-            train_features = []
-            for train_predictor in train_predictors:
-                self.monitor.notify('Processing')
-                train_features.append(get_prediction(train_node_pairs, train_predictor))
-                self.monitor.notify('Finished')
+            test_features = allocate_feature_matrix(test_set, test_predictors)
+            fill_predictions(test_features, test_set, test_predictors, progress=progress)
+        self.logger.info('Topology feature cache: %s', self.cache.summary())
         print("_calculate_topology_features")
         return (train_features, test_features)
 
-    def _create_topology_df(self, train_preds, test_preds, train_set, test_set, columns_header):
+    def _topology_progress(self, predictors, train_set, test_set):
+        """
+        Return a progress callback for the scores of the topology predictors.
+        Their monitor steps are reported in proportion to the scores written
+        so far, since the predictors are not scored one after another.
+        """
+        steps = len(predictors)
+        total = steps * (len(train_set) + (len(test_set) if self.validation else 0))
+        scored, finished = 0, 0
+
+        def progress(count):
+            nonlocal scored, finished
+            scored += count
+            while finished < steps and scored * steps >= (finished + 1) * total:
+                self.monitor.notify('Finished')
+                finished += 1
+                if finished < steps:
+                    self.monitor.notify('Processing')
+
+        if steps > 0:
+            self.monitor.notify('Processing')
+            progress(0)
+        return progress
+
+    def _calculate_topology_features_parallel(self, train_predictors, test_predictors, train_set, test_set):
+        progress = self._topology_progress(train_predictors, train_set, test_set)
+        test_features = None
+        train_features = allocate_feature_matrix(train_set, train_predictors)
+        fill_predictions_parallel(train_features, train_set, train_predictors, self.processes,
+                                  progress=progress)
+        if self.validation:
+            test_features = allocate_feature_matrix(test_set, test_predictors)
+            fill_predictions_parallel(test_features, test_set, test_predictors, self.processes,
+                                      progress=progress)
+        self.logger.info('Topology feature cache: %s', self.cache.summary())
+        return (train_features, test_features)
+
+    def _create_topology_df(self, train_features, test_features, train_set, test_set, columns_header):
         train_final, test_final = None, None
         if self.validation:
-            train_df = get_dataframe(train_preds, columns_header)
-            test_df = get_dataframe(test_preds, columns_header)
-            train_final = pd.concat([train_set, train_df], axis=1)
-            test_final = pd.concat([test_set, test_df], axis=1)
+            train_df = pd.DataFrame(train_features, columns=columns_header, copy=False)
+            test_df = pd.DataFrame(test_features, columns=columns_header, copy=False)
+            train_final = pd.concat([self._label_df(train_set), train_df], axis=1)
+            test_final = pd.concat([self._label_df(test_set), test_df], axis=1)
         else:
-            train_df = get_dataframe(train_preds, columns_header)
-            train_final = pd.concat([train_set, train_df], axis=1)
+            train_df = pd.DataFrame(train_features, columns=columns_header, copy=False)
+            train_final = pd.concat([self._label_df(train_set), train_df], axis=1)
         print("_create_topology_df")
         return (train_final, test_final)
 
-    def _add_topology_to_predicted_graph(self, train_t_df, test_t_df, predicted_graph_train, predicted_graph_test):
+    def _add_topology_to_predicted_graph(self, train_t_df, test_t_df, train_set, test_set, predicted_graph_train, predicted_graph_test):
         if self.validation:
-            columns_header = self._get_topology_columnsheader()
-            thresholds = self._get_topology_thresholds(test_t_df, columns_header)
-            print("start _add_topology_to_predicted_graph 1")
-            for index, row in test_t_df.iterrows():
-                node_pair = row['node_pairs']
-                for col in columns_header:
-                    if row[col] > thresholds[col]:
-                        add_or_update_edge(
-                            graph=predicted_graph_test,
-                            edge=(node_pair[0], node_pair[1]),
-                            method_name='Topology',
-                            method_specified=str(col),
-                            score=row[col])   
-            print("done with outer loop in 1")
-            
+            self._add_topology_hits(test_t_df, test_set, predicted_graph_test)
         else:
-            columns_header = self._get_topology_columnsheader()
-            thresholds = self._get_topology_thresholds(train_t_df, columns_header)
-            print("start _add_topology_to_predicted_graph 2")
-            for index, row in train_t_df.iterrows():
-                node_pair = row['node_pairs']
-                for col in columns_header:
-                    if row[col] > thresholds[col]:
-                        add_or_update_edge(
-                            graph=predicted_graph_train,
-                            edge=(node_pair[0], node_pair[1]),
-                            method_name='Topology',
-                            method_specified=str(col),
-                            score=row[col])   
-            print("done with outer loop in 2")
+            self._add_topology_hits(train_t_df, train_set, predicted_graph_train)
+
+    def _add_topology_hits(self, t_df, candidates, predicted_graph):
+        columns_header = self._get_topology_columnsheader()
+        thresholds = self._get_topology_thresholds(t_df, columns_header)
+        scores = t_df[columns_header].to_numpy()
+        # Row-major hits keep the insertion order of the former row-by-row loop
+        rows, columns = np.nonzero(scores > thresholds.to_numpy())
+        add_or_update_edges(
+            graph=predicted_graph,
+            edges=candidates[rows],
+            method_name='Topology',
+            methods_specified=[str(columns_header[column]) for column in columns.tolist()],
+            scores=scores[rows, columns])
 
     def _get_topology_thresholds(self, df, columns_header):
         false_predictions_df = df[df['label'] == 0]
@@ -363,24 +442,23 @@ class PredictionWorker(object):
     def _calculate_socialtheory_features(self, train_predictors, test_predictors, train_set, test_set, predicted_train_graph, predicted_test_graph):
         train_features, test_features = None, None
         if self.validation:
-            train_node_pairs = train_set.node_pairs.values
-            test_node_pairs = test_set.node_pairs.values
             df_train, df_test = None, None
             for train_predictor, test_predictor in zip(train_predictors, test_predictors):
                 self.monitor.notify('Processing')
-                train_predictor.predict(train_node_pairs)
-                test_predictor.predict(test_node_pairs)
+                train_predictor.predict(train_set)
+                test_predictor.predict(test_set)
                 self.monitor.notify('Finished')
-            df_train = get_st_features_from_predicted_graph(predicted_train_graph, train_node_pairs).drop('node_pairs', axis=1)
-            df_test = get_st_features_from_predicted_graph(predicted_test_graph, test_node_pairs).drop('node_pairs', axis=1)
+            df_train, df_test = align_st_features(
+                get_st_features(predicted_train_graph, train_set),
+                get_st_features(predicted_test_graph, test_set)
+            )
         else:
-            train_node_pairs = train_set.node_pairs.values
             df_train, df_test = None, None
             for train_predictor in train_predictors:
                 self.monitor.notify('Processing')
-                train_predictor.predict(train_node_pairs)
+                train_predictor.predict(train_set)
                 self.monitor.notify('Finished')
-            df_train = get_st_features_from_predicted_graph(predicted_train_graph, train_node_pairs).drop('node_pairs', axis=1)
+            df_train = get_st_features(predicted_train_graph, train_set)
         return (df_train, df_test)
 
     ######################################
@@ -471,35 +549,29 @@ class PredictionWorker(object):
 
         return (predictions_train, predictions_test)
 
-    def _add_classification_to_predicted_graph(self, node_pairs, train_c_df, test_c_df, predicted_graph_train, predicted_graph_test):
+    def _add_classification_to_predicted_graph(self, train_set, test_set, train_c_df, test_c_df, predicted_graph_train, predicted_graph_test):
         if self.validation:
-            columns_header = self._create_classifiers_columnsheader()
-            test_c_df = pd.concat([node_pairs, test_c_df], axis=1)
-            for index, row in test_c_df.iterrows():
-                node_pair = row['node_pairs']
-                for col in columns_header:
-                    if row[col] >= 0.5:
-                        add_or_update_edge(
-                            graph=predicted_graph_test,
-                            edge=(node_pair[0], node_pair[1]),
-                            method_name='ML-Classification',
-                            method_specified=col,
-                            score=row[col]
-                        )                 
+            self._add_classification_hits(test_c_df, test_set, predicted_graph_test)
         else:
-            columns_header = self._create_classifiers_columnsheader()
-            train_c_df = pd.concat([node_pairs, train_c_df], axis=1)
-            for index, row in train_c_df.iterrows():
-                node_pair = row['node_pairs']
-                for col in columns_header:
-                    if row[col] >= 0.5:
-                        add_or_update_edge(
-                            graph=predicted_graph_train,
-                            edge=(node_pair[0], node_pair[1]),
-                            method_name='ML-Classification',
-                            method_specified=col,
-                            score=row[col]
-                        )
+            self._add_classification_hits(train_c_df, train_set, predicted_graph_train)
+
+    def _add_classification_hits(self, c_df, candidates, predicted_graph):
+        columns_header = self._create_classifiers_columnsheader()
+        if len(columns_header) <= 0:
+            return
+        probabilities = c_df[columns_header].to_numpy()
+        rows, columns = np.nonzero(probabilities >= self._get_classifier_cutoffs())
+        add_or_update_edges(
+            graph=predicted_graph,
+            edges=candidates[rows],
+            method_name='ML-Classification',
+            methods_specified=[columns_header[column] for column in columns.tolist()],
+            scores=probabilities[rows, columns])
+
+    def _get_classifier_cutoffs(self):
+        return np.array([(predictor.get('parameters') or {}).get('cutoff', DEFAULT_CLASSIFIER_CUTOFF)
+                         for predictor in self.predictors
+                         if predictor['feature_type'] == "ML-Classifier"])
 
     ######################################
     # Pipeline - Evaluation              #
@@ -512,8 +584,8 @@ class PredictionWorker(object):
             results_test = {}
             labels_train = predictions_train_df['label']
             labels_test = predictions_test_df['label']
-            predictions_train = predictions_train_df.drop(['node_pairs', 'label'], axis=1)
-            predictions_test = predictions_test_df.drop(['node_pairs', 'label'], axis=1)
+            predictions_train = predictions_train_df.drop('label', axis=1)
+            predictions_test = predictions_test_df.drop('label', axis=1)
             for predictor in predictions_train.columns:
                 roc_train = ROC(labels_train.values, predictions_train[predictor].values)
                 auc_train = AUC(labels_train.values, predictions_train[predictor].values)
@@ -527,7 +599,7 @@ class PredictionWorker(object):
         else:
             results_train = {}
             labels_train = predictions_train_df['label']
-            predictions_train = predictions_train_df.drop(['node_pairs', 'label'], axis=1)
+            predictions_train = predictions_train_df.drop('label', axis=1)
             for predictor in predictions_train.columns:
                 roc = ROC(labels_train.values, predictions_train[predictor].values)
                 auc = AUC(labels_train.values, predictions_train[predictor].values)
@@ -540,14 +612,16 @@ class PredictionWorker(object):
     # MISC                               #
     ######################################
 
-    def _save_predicted_graph(self, predicted_graph_train, predicted_graph_test):
+    def _save_predicted_graph(self, predicted_graph_train, predicted_graph_test, train_graph, test_graph):
         self.monitor.notify('Processing')
 
+        # Only the saved graph is built in the hierarchical form
         pred_net = DatabaseConnector.get_db_instance().get_predicted_network_by_id('project_id', self.project_id)
         if self.validation:
-            save_predicted_graph_to_db(predicted_graph_test, pred_net['predicted_network_id'])
+            predicted_graph = predicted_graph_test.materialize(flat_to_hierarchical(test_graph))
         else:
-            save_predicted_graph_to_db(predicted_graph_train, pred_net['predicted_network_id'])
+            predicted_graph = predicted_graph_train.materialize(flat_to_hierarchical(train_graph))
+        save_predicted_graph_to_db(predicted_graph, pred_net['predicted_network_id'])
 
         self.monitor.notify('Finished')
 
@@ -6,6 +6,12 @@ from sklearn.neighbors import KNeighborsClassifier
 from sklearn.svm import SVC
 from sklearn.tree import DecisionTreeClassifier
 
+# Import shared per-run cache and graph views
+from linkprediction.prediction_methods.prediction.graph_cache import \
+    GraphCache
+from linkprediction.prediction_methods.prediction.adjacency import \
+    to_undirected_graph
+
 # Import similarity indices predictors
 from linkprediction.prediction_methods.prediction.similarity_indices import (
     AdamicAdar, AdjustedRand, CommonNeighbors, Jaccard,
@@ -24,6 +30,11 @@ from linkprediction.prediction_methods.prediction.social_theory import (
 
 class LinkPredictorFactory:
 
+    def __init__(self, cache: GraphCache = None, seed=None):
+        self.cache = cache if cache is not None else GraphCache()
+        self.seed = seed
+        self._undirected_graphs = {}
+
     def create(self, model, **kwargs):
         if self._is_topology(model):
             return self._create_topology(model, **kwargs)
@@ -43,39 +54,48 @@ class LinkPredictorFactory:
 
     def _create_topology(self, model, graph):
         name = model['designation']
+        graph = self._get_undirected_graph(graph)
+        backend = (model.get('parameters') or {}).get('backend', 'scipy')
 
         if name == "AdamicAdar":
-            return AdamicAdar(graph.to_undirected())
+            return AdamicAdar(graph, backend=backend, cache=self.cache)
         elif name == "AdjustedRand":
-            return AdjustedRand(graph.to_undirected())
+            return AdjustedRand(graph, backend=backend, cache=self.cache)
         elif name == "CommonNeighbors":
-            return CommonNeighbors(graph.to_undirected())
+            return CommonNeighbors(graph, backend=backend, cache=self.cache)
         elif name == "Jaccard":
-            return Jaccard(graph.to_undirected())
+            return Jaccard(graph, backend=backend, cache=self.cache)
         elif name == "Salton":
-            return Salton(graph.to_undirected())
+            return Salton(graph, backend=backend, cache=self.cache)
         elif name == "PreferentialAttachement":
-            return PreferentialAttachement(graph.to_undirected())
+            return PreferentialAttachement(graph, backend=backend, cache=self.cache)
         elif name == "ResourceAllocation":
-            return ResourceAllocation(graph.to_undirected())
+            return ResourceAllocation(graph, backend=backend, cache=self.cache)
         elif name == "SameCommunity":
-            return SameCommunity(graph.to_undirected())
+            return SameCommunity(graph, cache=self.cache, **self._get_community_parameters(model))
         elif name == "ShortestPath":
-            return ShortestPath(graph.to_undirected())
+            parameters = model.get('parameters') or {}
+            return ShortestPath(
+                graph,
+                method=parameters.get('method', 'bfs'),
+                cutoff=parameters.get('cutoff'),
+                unreachable=parameters.get('unreachable', -1),
+                cache=self.cache
+            )
         elif name == "TotalNeighbors":
-            return TotalNeighbors(graph.to_undirected())
+            return TotalNeighbors(graph, backend=backend, cache=self.cache)
         elif name == "UDegree":
-            return UDegree(graph.to_undirected())
+            return UDegree(graph, backend=backend, cache=self.cache)
         elif name == "VDegree":
-            return VDegree(graph.to_undirected())
+            return VDegree(graph, backend=backend, cache=self.cache)
         elif name == "Sorensen":
-            return Sorensen(graph.to_undirected())
+            return Sorensen(graph, backend=backend, cache=self.cache)
         elif name == "HubPromoted":
-            return HubPromoted(graph.to_undirected())
+            return HubPromoted(graph, backend=backend, cache=self.cache)
         elif name == "HubDepressed":
-            return HubDepressed(graph.to_undirected())
+            return HubDepressed(graph, backend=backend, cache=self.cache)
         elif name == "LeichtHolmeNewman":
-            return LeichtHolmeNewman(graph.to_undirected())
+            return LeichtHolmeNewman(graph, backend=backend, cache=self.cache)
         else:
             raise ValueError(
                 "Invalid value for `designation` ({0})."
@@ -88,11 +108,12 @@ class LinkPredictorFactory:
         if name == "SocialExchangeTheory":
             return SocialExchangeTheory(graph, predicted_graph)
         elif name == "BalanceTheory":
-            return EndogenousBalanceTheory(graph, predicted_graph)
+            return EndogenousBalanceTheory(graph, predicted_graph, cache=self.cache)
         elif name == "CollectiveActionTheory":
-            return EndogenousCollectiveActionTheory(graph, predicted_graph)
+            return EndogenousCollectiveActionTheory(graph, predicted_graph, cache=self.cache)
         elif name == "StructuralHoleTheory":
-            return StructuralHoleTheory(graph, predicted_graph)
+            return StructuralHoleTheory(graph, predicted_graph, cache=self.cache,
+                                        **self._get_community_parameters(model))
         else:
             raise ValueError(
                 "Invalid value for `designation` ({0})."
@@ -108,11 +129,13 @@ class LinkPredictorFactory:
         if name == "HomophilyTheories":
             return HomophilyTheories(graph, predicted_graph, threshold, weightings)
         elif name == "BalanceTheory":
-            return ExogenousBalanceTheory(graph, predicted_graph, threshold, weightings)
+            return ExogenousBalanceTheory(graph, predicted_graph, threshold, weightings,
+                                          cache=self.cache)
         elif name == "ResourceDependenceTheory":
             return ResourceDependencyTheory(graph, predicted_graph, threshold, weightings)
         elif name == "CollectiveActionTheory":
-            return ExogenousCollectiveActionTheory(graph, predicted_graph, threshold, weightings)
+            return ExogenousCollectiveActionTheory(graph, predicted_graph, threshold, weightings,
+                                                   cache=self.cache)
         else:
             raise ValueError(
                 "Invalid value for `designation` ({0})."
@@ -142,6 +165,25 @@ class LinkPredictorFactory:
                 .format(name)
             )
 
+    def _get_community_parameters(self, model):
+        parameters = model.get('parameters') or {}
+        return {
+            'community_detection': parameters.get('community_detection', 'girvan_newman'),
+            'iterations': parameters.get('iterations', 1),
+            'seed': self.seed
+        }
+
+    def _get_undirected_graph(self, graph):
+        """
+        Return an undirected, attribute-free copy of the graph. It is built
+        once per graph and shared by all topology predictors, which only
+        read it, instead of a full to_undirected() copy per predictor.
+        """
+        token = self.cache.token(graph)
+        if token not in self._undirected_graphs:
+            self._undirected_graphs[token] = to_undirected_graph(graph)
+        return self._undirected_graphs[token]
+
     def _create_others(self, model):
         raise NotImplementedError()
 
@@ -0,0 +1,316 @@
+"""
+Generation of the candidate node pairs (missing edges) of a graph.
+
+Candidates are returned as two int32 arrays ``u`` and ``v`` holding the
+positions of the nodes in ``list(G)`` instead of lists of node tuples, so a
+candidate costs 8 bytes instead of a tuple of two node objects.
+"""
+import networkx as nx
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from linkprediction.prediction_methods.prediction.adjacency import CSRAdjacency
+
+# Approximate number of candidate pairs per chunk of iter_missing_edges
+DEFAULT_CHUNK_SIZE = 2 ** 22
+
+CANDIDATE_STRATEGIES = ('all', 'negative_sampling', 'distance')
+
+
+class CandidatePairs:
+    """Columnar table of candidate node pairs.
+
+    Pairs are stored as two int32 arrays of positions in ``nodes`` (8 bytes
+    per pair) with an optional uint8 label array, instead of a column of
+    node tuples. Indexing with an integer returns the node tuple of a pair,
+    indexing with a slice or an index array returns a table of the selected
+    pairs, and iterating yields node tuples.
+
+    nodes: node IDs, e.g. ``list(G)``
+    u, v: int32 arrays with the node positions of the pairs
+    label: optional uint8 array with the label of every pair
+    """
+
+    def __init__(self, nodes, u, v, label=None):
+        self.nodes = nodes
+        self.u = u
+        self.v = v
+        self.label = label
+        self._translations = {}
+
+    @classmethod
+    def from_node_pairs(cls, node_pairs):
+        """Build a table from a sequence of node tuples."""
+        node_index = {}
+        positions = np.fromiter(
+            (node_index.setdefault(node, len(node_index))
+             for node_pair in node_pairs for node in node_pair[:2]),
+            dtype=np.int32,
+            count=2 * len(node_pairs)
+        ).reshape(-1, 2)
+        return cls(list(node_index), positions[:, 0].copy(), positions[:, 1].copy())
+
+    def __len__(self):
+        return len(self.u)
+
+    def __getitem__(self, index):
+        if isinstance(index, (slice, np.ndarray)):
+            pairs = CandidatePairs(self.nodes, self.u[index], self.v[index],
+                                   None if self.label is None else self.label[index])
+            pairs._translations = self._translations
+            return pairs
+        return (self.nodes[self.u[index]], self.nodes[self.v[index]])
+
+    def __iter__(self):
+        nodes = self.nodes
+        return ((nodes[u], nodes[v]) for u, v in zip(self.u.tolist(), self.v.tolist()))
+
+    @property
+    def nbytes(self):
+        label_nbytes = 0 if self.label is None else self.label.nbytes
+        return self.u.nbytes + self.v.nbytes + label_nbytes
+
+    def keys(self):
+        """Return the int64 keys ``u * len(nodes) + v`` of the pairs."""
+        return self.u.astype(np.int64) * len(self.nodes) + self.v
+
+    def pair_indices(self, node_index):
+        """
+        Return u and v as int32 positions in another node order, given as
+        a dict from node ID to position (e.g. CSRAdjacency.node_index).
+        """
+        entry = self._translations.get(id(node_index))
+        if entry is None:
+            translation = np.fromiter((node_index[node] for node in self.nodes),
+                                      dtype=np.int32, count=len(self.nodes))
+            # The dict is kept alive so that its id is not reused
+            entry = self._translations[id(node_index)] = (node_index, translation)
+        translation = entry[1]
+        return translation[self.u], translation[self.v]
+
+
+def generate_candidates(G, strategy='all', label_graph=None, ratio=1.0, seed=None,
+                        max_distance=2, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Return the candidate pairs of G as two int32 arrays of node positions.
+
+    strategy:
+        all -> every missing edge of G (see iter_missing_edges)
+        negative_sampling -> the missing edges of G that are edges of
+            label_graph plus ``ratio`` times as many uniformly sampled pairs
+            that are edges of neither graph (see sample_negative_candidates)
+        distance -> the missing edges of G whose nodes are at most
+            ``max_distance`` hops apart (see find_candidates_within_distance)
+    label_graph: graph whose edges are the positive candidates
+        (negative_sampling only)
+    ratio: number of negative per positive candidate (negative_sampling only)
+    seed: seed or numpy Generator (negative_sampling only)
+    max_distance: maximum number of hops (distance only)
+    """
+    if strategy not in CANDIDATE_STRATEGIES:
+        raise ValueError(
+            "Invalid value for `candidate_strategy` ({0}), must be one of {1}"
+            .format(strategy, CANDIDATE_STRATEGIES)
+        )
+    if strategy == 'all':
+        return find_missing_edges(G, chunk_size)
+    if strategy == 'distance':
+        return find_candidates_within_distance(G, max_distance, chunk_size=chunk_size)
+    if label_graph is None:
+        raise ValueError('Negative sampling requires a label graph!')
+    return sample_negative_candidates(G, label_graph, ratio, seed)
+
+
+def iter_missing_edges(G, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield the missing edges of G as chunks of int32 (u, v) position arrays.
+
+    Pairs are ordered by source and target position. Directed graphs yield
+    ordered pairs, undirected graphs every unordered pair once (u < v).
+    Self-loops are never candidates, like in ``networkx.non_edges``. Each
+    chunk holds about ``chunk_size`` pairs (at least one source row).
+    """
+    adjacency = CSRAdjacency.from_graph(G)
+    n = len(adjacency)
+    indptr, indices = adjacency.indptr, adjacency.indices
+    positions = np.arange(n)
+    rows_per_chunk = max(1, chunk_size // max(n, 1))
+    for start in range(0, n, rows_per_chunk):
+        stop = min(start + rows_per_chunk, n)
+        rows = positions[start:stop]
+        missing = np.ones((stop - start, n), dtype=bool)
+        missing[np.repeat(rows - start, np.diff(indptr[start:stop + 1])),
+                indices[indptr[start]:indptr[stop]]] = False
+        missing[rows - start, rows] = False
+        if not adjacency.directed:
+            missing &= positions > rows[:, None]
+        u, v = np.nonzero(missing)
+        yield (u + start).astype(np.int32), v.astype(np.int32)
+
+
+def find_missing_edges(G, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Return all missing edges of G as int32 (u, v) arrays (see iter_missing_edges)."""
+    n = G.number_of_nodes()
+    pairs = n * (n - 1) if G.is_directed() else n * (n - 1) // 2
+    count = pairs - (G.number_of_edges() - nx.number_of_selfloops(G))
+    u = np.empty(count, dtype=np.int32)
+    v = np.empty(count, dtype=np.int32)
+    start = 0
+    for chunk_u, chunk_v in iter_missing_edges(G, chunk_size):
+        stop = start + len(chunk_u)
+        u[start:stop] = chunk_u
+        v[start:stop] = chunk_v
+        start = stop
+    return u, v
+
+
+def iter_candidates_within_distance(G, max_distance=2, min_distance=2,
+                                   chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield the pairs of G whose shortest path is between ``min_distance``
+    and ``max_distance`` hops long as chunks of int32 (u, v) position arrays.
+
+    The hops follow the out-edges of directed graphs. Pairs are ordered like
+    in iter_missing_edges; undirected graphs yield every pair once (u < v).
+    With ``min_distance >= 2`` all pairs are missing edges. The search runs
+    level by level on the sparse adjacency matrix for a block of sources at
+    once, so node IDs can be arbitrary.
+    """
+    if min_distance < 1 or max_distance < min_distance:
+        raise ValueError('Invalid distance values. They must fulfil '
+                         '1 <= min_distance <= max_distance!')
+    adjacency = CSRAdjacency.from_graph(G)
+    matrix = adjacency.matrix
+    n = len(adjacency)
+    rows_per_chunk = max(1, chunk_size // max(n, 1))
+    for start in range(0, n, rows_per_chunk):
+        stop = min(start + rows_per_chunk, n)
+        rows = np.arange(stop - start)
+        visited = csr_matrix((np.ones(len(rows)), (rows, rows + start)), shape=(len(rows), n))
+        frontier = visited
+        candidates = csr_matrix((len(rows), n))
+        for distance in range(1, max_distance + 1):
+            frontier = frontier.dot(matrix)
+            frontier.data[:] = 1
+            frontier = frontier - frontier.multiply(visited)
+            frontier.eliminate_zeros()
+            if frontier.nnz == 0:
+                break
+            visited = visited + frontier
+            if distance >= min_distance:
+                candidates = candidates + frontier
+
+        candidates = candidates.tocsr()
+        candidates.sort_indices()
+        u = np.repeat(rows + start, np.diff(candidates.indptr))
+        v = candidates.indices
+        if not adjacency.directed:
+            u, v = u[v > u], v[v > u]
+        yield u.astype(np.int32), v.astype(np.int32)
+
+
+def find_candidates_within_distance(G, max_distance=2, min_distance=2,
+                                    chunk_size=DEFAULT_CHUNK_SIZE):
+    """Return the pairs of iter_candidates_within_distance as int32 (u, v) arrays."""
+    chunks = list(iter_candidates_within_distance(G, max_distance, min_distance, chunk_size))
+    if not chunks:
+        return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32)
+    return (np.concatenate([u for u, _ in chunks]),
+            np.concatenate([v for _, v in chunks]))
+
+
+def sample_negative_candidates(G, label_graph, ratio=1.0, seed=None):
+    """
+    Return the missing edges of G that are edges of ``label_graph``
+    (positives) and ``ratio`` times as many pairs drawn uniformly without
+    replacement from the pairs that are edges of neither graph (negatives),
+    as int32 (u, v) arrays ordered by source and target position.
+    """
+    if ratio < 0:
+        raise ValueError('Invalid ratio value. It must be greater than or equal to 0!')
+    rng = np.random.default_rng(seed)
+    nodes = list(G)
+    node_index = {node: index for index, node in enumerate(nodes)}
+    n = len(nodes)
+    directed = G.is_directed()
+
+    graph_keys = edge_keys(G, node_index, directed)
+    label_keys = edge_keys(label_graph, node_index, directed)
+    positives = np.setdiff1d(label_keys, graph_keys, assume_unique=True)
+    excluded = np.union1d(graph_keys, label_keys)
+    negatives = _sample_pair_keys(n, directed, excluded, int(round(ratio * len(positives))), rng)
+
+    keys = np.sort(np.concatenate([positives, negatives]))
+    return (keys // n).astype(np.int32), (keys % n).astype(np.int32)
+
+
+def edge_keys(G, node_index, directed):
+    """
+    Return the sorted unique int64 keys ``u * n + v`` of the edges of G,
+    with u, v the positions in ``node_index``. Undirected keys use
+    ``u < v``. Self-loops and edges with nodes outside of ``node_index``
+    are dropped.
+    """
+    n = len(node_index)
+    edges = np.fromiter(
+        (node_index.get(node, -1) for edge in G.edges() for node in edge),
+        dtype=np.int64,
+        count=2 * G.number_of_edges()
+    ).reshape(-1, 2)
+    edges = edges[(edges != -1).all(axis=1)]
+    u, v = edges[:, 0], edges[:, 1]
+    if not directed:
+        u, v = np.minimum(u, v), np.maximum(u, v)
+    return np.unique(u[u != v] * n + v[u != v])
+
+
+def _sample_pair_keys(n, directed, excluded, count, rng, chunk_size=DEFAULT_CHUNK_SIZE):
+    pairs = n * (n - 1) if directed else n * (n - 1) // 2
+    available = pairs - len(excluded)
+    count = min(count, available)
+    if count <= 0:
+        return np.empty(0, dtype=np.int64)
+    if count > available // 2:
+        # Dense sample: keep every available pair but a uniform sample of the
+        # others, enumerating the pairs one block of rows at a time
+        dropped = np.sort(_sample_pair_keys(n, directed, excluded, available - count, rng))
+        keys = np.empty(count, dtype=np.int64)
+        size = 0
+        rows_per_chunk = max(1, chunk_size // n)
+        for start in range(0, n, rows_per_chunk):
+            stop = min(start + rows_per_chunk, n)
+            u, v = np.divmod(np.arange(start * n, stop * n, dtype=np.int64), n)
+            block = (u * n + v)[(u < v) | (directed & (u != v))]
+            block = block[~_is_in_sorted(block, excluded) & ~_is_in_sorted(block, dropped)]
+            keys[size:size + len(block)] = block
+            size += len(block)
+        return keys
+
+    # Rejection sampling is efficient while most pairs are available
+    keys = np.empty(0, dtype=np.int64)
+    while len(keys) < count:
+        draws = 2 * (count - len(keys)) + 16
+        u = rng.integers(0, n, draws, dtype=np.int64)
+        v = rng.integers(0, n, draws, dtype=np.int64)
+        if not directed:
+            u, v = np.minimum(u, v), np.maximum(u, v)
+        drawn = (u * n + v)[u != v]
+        drawn = drawn[~_is_in_sorted(drawn, excluded)]
+        keys = np.concatenate([keys, drawn])
+        # Keep the first draw of every pair so that the sample stays uniform
+        _, first = np.unique(keys, return_index=True)
+        keys = keys[np.sort(first)]
+    return keys[:count]
+
+
+def _is_in_sorted(keys, sorted_keys):
+    """Element-wise membership of ``keys`` in the sorted array ``sorted_keys``."""
+    if len(sorted_keys) == 0:
+        return np.zeros(len(keys), dtype=bool)
+    position = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+    return sorted_keys[position] == keys
+
+
+def to_node_pairs(nodes, u, v):
+    """Translate int32 (u, v) position arrays to a list of node tuples."""
+    return [(nodes[a], nodes[b]) for a, b in zip(u.tolist(), v.tolist())]
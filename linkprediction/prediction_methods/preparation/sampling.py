@@ -1,24 +1,58 @@
-import random
-import queue
 import networkx as nx
-random.seed(42)  # For reproducibility
+import numpy as np
 
+from linkprediction.prediction_methods.preparation.candidates import (
+    find_candidates_within_distance, to_node_pairs)
 
-def sampling_by_percentage(G, percentage):
-    if percentage < 0 and percentage > 1:
+
+def sampling_by_percentage(G, percentage, seed=None):
+    if percentage < 0 or percentage > 1:
         raise ValueError('Invalid percentage value. It must be among 0 and 1!')
-    return sampling_by_count(G, G.number_of_edges() * percentage)
+    return sampling_by_count(G, G.number_of_edges() * percentage, seed)
+
 
+def sampling_by_count(G, linksCount, seed=None):
+    """
+    Return a read-only view of G (see without_edges) that keeps
+    int(linksCount) edges drawn uniformly at random without replacement.
 
-def sampling_by_count(G, linksCount):
+    seed: seed or numpy Generator (np.random.default_rng). Pass the same
+        Generator to nested samplings (e.g. test -> train graph) to draw
+        reproducible, independent samples.
+    """
     if linksCount > G.number_of_edges():
         raise ValueError('Invalid links count value. It must be smaller than the maximum graph edges!')
 
-    adjustedGraph = G.copy()
-    for i in range(G.number_of_edges() - int(linksCount)):
-        edgeToRemove = random.choice(list(adjustedGraph.edges()))
-        adjustedGraph.remove_edge(*edgeToRemove)
-    return adjustedGraph
+    rng = np.random.default_rng(seed)
+    edges = list(G.edges())
+    removed = rng.permutation(len(edges))[int(linksCount):]
+    return without_edges(G, [edges[i] for i in removed.tolist()])
+
+
+class EdgeMask:
+    """Edge filter of a graph view that hides a set of edges."""
+
+    def __init__(self, edges, directed=True):
+        self.edges = set(edges)
+        if not directed:
+            self.edges.update([(v, u) for u, v in self.edges])
+
+    def __call__(self, u, v):
+        return (u, v) not in self.edges
+
+
+def without_edges(G, edges):
+    """
+    Return a read-only view of G without ``edges``. The view shares the
+    nodes, edges and attributes of G instead of copying them. A view of
+    such a view is built on the underlying graph with the union of both
+    masks, so that nested samplings do not stack edge filters.
+    """
+    edge_mask = EdgeMask(edges, G.is_directed())
+    if isinstance(getattr(G, '_EDGE_OK', None), EdgeMask):
+        edge_mask.edges |= G._EDGE_OK.edges
+        G = G._graph
+    return nx.subgraph_view(G, filter_edge=edge_mask)
 
 
 def sampling_by_time(G, timepoint):
@@ -31,44 +65,13 @@ def find_all_missing_edges(G):
 
 
 def find_missing_edges_at_distance(G, distance, undirected=True):
-    missingLinks = []
-    for node in G.nodes():
-        missingNodesAtU = find_from_node(G, node, distance)
-        missingLinks.extend(missingNodesAtU)
-
-    if(undirected):
-        missingLinks = list(remove_reversed_duplicates(missingLinks))
-    return missingLinks
-
-
-def find_from_node(G, u, distance):
-    missingLinks = []
-    visited = [False] * (G.number_of_nodes() + 1)
-    q = queue.Queue()
-    q.put(u)
-    visited[u] = True
-
-    for i in range(1, distance + 1):
-        newFound = queue.Queue() 
-        while not q.empty():
-            temp = q.get()
-            for v in G.neighbors(temp):
-                if not visited[v]:
-                    newFound.put(v)
-                    visited[v] = True
-        q = newFound
-
-    while not q.empty():
-        v = q.get()
-        if not G.has_edge(u, v):
-            missingLinks.append((u, v))
-
-    return missingLinks
-
-
-def remove_reversed_duplicates(missingLinks):
-    seenLinks = set()
-    for link in missingLinks:
-        if link not in seenLinks:
-            seenLinks.add(link[::-1])
-            yield link
+    nodes = list(G)
+    u, v = find_candidates_within_distance(G, distance, min_distance=distance)
+    if undirected and G.is_directed():
+        # Keep one direction of reciprocal pairs (the first in node order)
+        n = len(nodes)
+        keys = u.astype(np.int64) * n + v
+        reversed_keys = v.astype(np.int64) * n + u
+        keep = (u < v) | ~np.isin(reversed_keys, keys)
+        u, v = u[keep], v[keep]
+    return to_node_pairs(nodes, u, v)
@@ -1,7 +1,10 @@
+import numpy as np
 import pandas as pd
 from functools import partial
 from networkx import Graph
 
+from linkprediction.prediction_methods.preparation.candidates import edge_keys
+
 
 def assign_labels(node_set, graph):
     nodes = node_set.copy()
@@ -10,6 +13,33 @@ def assign_labels(node_set, graph):
     return dataset
 
 
+def label_candidates(nodes, u, v, graph):
+    """
+    Label candidate pairs with 1 if they are an edge of ``graph``, else 0.
+
+    nodes: node IDs of the positions in ``u`` and ``v``
+    u, v: int32 arrays with the node positions of the candidate pairs
+
+    The pairs are encoded as int64 keys and looked up in the sorted edge
+    keys of ``graph`` in one vectorized pass instead of one has_edge call
+    per pair. Returns the int32 arrays ``u`` and ``v`` and the uint8 labels.
+    """
+    node_index = {node: index for index, node in enumerate(nodes)}
+    n = len(nodes)
+    directed = graph.is_directed()
+    keys = edge_keys(graph, node_index, directed)
+
+    sources, targets = u.astype(np.int64), v.astype(np.int64)
+    if not directed:
+        sources, targets = np.minimum(sources, targets), np.maximum(sources, targets)
+    pair_keys = sources * n + targets
+    labels = np.zeros(len(pair_keys), dtype=np.uint8)
+    if len(keys) > 0:
+        position = np.minimum(np.searchsorted(keys, pair_keys), len(keys) - 1)
+        labels[keys[position] == pair_keys] = 1
+    return u, v, labels
+
+
 def assign_label(node_pair, graph):
     u, v = node_pair[0], node_pair[1]
     return (int(graph.has_edge(u, v)))
@@ -0,0 +1,82 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+import unittest
+
+import networkx as nx
+import numpy as np
+
+from linkprediction.graph_import.predicted_graph_handler import (
+    PredictedEdges, add_or_update_edge, align_st_features, get_st_features)
+from linkprediction.prediction_methods.preparation.candidates import (
+    CandidatePairs, edge_keys, sample_negative_candidates)
+
+
+class TestSampleNegativeCandidates(unittest.TestCase):
+    """Negative sampling of candidate pairs"""
+
+    def _assert_sample(self, graph, label_graph, ratio):
+        u, v = sample_negative_candidates(graph, label_graph, ratio=ratio, seed=7)
+        nodes = list(graph)
+        node_index = {node: index for index, node in enumerate(nodes)}
+        directed = graph.is_directed()
+        n = len(nodes)
+        keys = u.astype(np.int64) * n + v
+
+        self.assertEqual(len(np.unique(keys)), len(keys))
+        self.assertTrue((u != v).all())
+        if not directed:
+            self.assertTrue((u < v).all())
+        self.assertFalse(np.isin(keys, edge_keys(graph, node_index, directed)).any())
+
+        label_keys = edge_keys(label_graph, node_index, directed)
+        positives = np.isin(keys, label_keys)
+        pairs = n * (n - 1) if directed else n * (n - 1) // 2
+        available = pairs - len(np.union1d(edge_keys(graph, node_index, directed), label_keys))
+        expected = min(int(round(ratio * positives.sum())), available)
+        self.assertEqual((~positives).sum(), expected)
+
+    def test_sparse_sample(self):
+        label_graph = nx.gnp_random_graph(40, 0.1, seed=1, directed=True)
+        graph = nx.DiGraph(list(label_graph.edges())[::2])
+        graph.add_nodes_from(label_graph)
+        self._assert_sample(graph, label_graph, 1.0)
+
+    def test_dense_sample(self):
+        # More negatives requested than half of the available pairs
+        for directed in (True, False):
+            label_graph = nx.gnp_random_graph(30, 0.3, seed=2, directed=directed)
+            graph = label_graph.edge_subgraph(list(label_graph.edges())[::3]).copy()
+            graph.add_nodes_from(label_graph)
+            n = len(label_graph)
+            pairs = n * (n - 1) if directed else n * (n - 1) // 2
+            positives = label_graph.number_of_edges() - graph.number_of_edges()
+            available = pairs - label_graph.number_of_edges()
+            self._assert_sample(graph, label_graph, 0.75 * available / positives)
+            self._assert_sample(graph, label_graph, 2 * available / positives)
+
+
+class TestAlignStFeatures(unittest.TestCase):
+    """Train and test social-theory features get the same columns"""
+
+    def test_methods_without_hits_in_one_set(self):
+        graph = nx.DiGraph([(0, 1), (1, 2), (2, 3)])
+        train_edges, test_edges = PredictedEdges(graph), PredictedEdges(graph)
+        add_or_update_edge(train_edges, (0, 2), 'Endogenous Social Theory', 'CollectiveActionTheory', 1.0)
+        add_or_update_edge(train_edges, (1, 3), 'Endogenous Social Theory', 'BalanceTheory.021C', 1.0)
+        add_or_update_edge(test_edges, (0, 3), 'Exogenous Social Theory', 'HomophilyTheories', 1.0)
+        add_or_update_edge(test_edges, (1, 3), 'Endogenous Social Theory', 'BalanceTheory.021C', 1.0)
+        candidates = CandidatePairs.from_node_pairs([(0, 2), (0, 3), (1, 3)])
+
+        train_df, test_df = align_st_features(get_st_features(train_edges, candidates),
+                                              get_st_features(test_edges, candidates))
+
+        columns = ['CollectiveActionTheory', 'BalanceTheory.021C', 'HomophilyTheories']
+        self.assertEqual(list(train_df.columns), columns)
+        self.assertEqual(list(test_df.columns), columns)
+        self.assertEqual(train_df.values.tolist(), [[1, 0, 0], [0, 0, 0], [0, 1, 0]])
+        self.assertEqual(test_df.values.tolist(), [[0, 0, 0], [0, 0, 1], [0, 1, 0]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+import unittest
+
+import networkx as nx
+import numpy as np
+
+from linkprediction.prediction_methods.prediction.adjacency import get_adjacency
+from linkprediction.prediction_methods.prediction.centrality import katz_centrality
+from linkprediction.prediction_methods.prediction.graph_cache import GraphCache
+
+
+def _graphs():
+    for seed, directed in ((0, False), (1, True), (2, False), (3, True)):
+        graph = nx.gnp_random_graph(30, 0.1, seed=seed, directed=directed)
+        graph.add_edges_from([(2, 2), (7, 7)])
+        yield graph
+
+
+def _expected(centrality, nodes):
+    return np.array([centrality[node] for node in nodes])
+
+
+class TestKatzCentrality(unittest.TestCase):
+    """Sparse Katz centrality matches networkx"""
+
+    def test_katz_centrality(self):
+        for graph in _graphs():
+            cache = GraphCache()
+            nodes = get_adjacency(graph, cache).nodes
+            np.testing.assert_allclose(
+                katz_centrality(graph, cache),
+                _expected(nx.katz_centrality_numpy(graph), nodes), atol=1e-8
+            )
+
+    def test_nodes_mask(self):
+        for graph in _graphs():
+            cache = GraphCache()
+            nodes = get_adjacency(graph, cache).nodes
+            nodes_mask = np.arange(len(nodes)) % 3 != 0
+            subset = [node for node, selected in zip(nodes, nodes_mask) if selected]
+            np.testing.assert_allclose(
+                katz_centrality(graph, cache, nodes_mask=nodes_mask),
+                _expected(nx.katz_centrality(graph.subgraph(subset), tol=1e-10), subset),
+                atol=1e-8
+            )
+
+    def test_subsets_are_not_cached(self):
+        graph = next(_graphs())
+        cache = GraphCache()
+        katz_centrality(graph, cache)
+        nbytes = cache.nbytes
+        for position in range(len(graph)):
+            nodes_mask = np.arange(len(graph)) != position
+            katz_centrality(graph, cache, nodes_mask=nodes_mask)
+        self.assertEqual(cache.nbytes, nbytes)
+
+    def test_direct_solution(self):
+        """Test case for the direct solution when the iteration diverges"""
+        for graph in _graphs():
+            cache = GraphCache()
+            nodes = get_adjacency(graph, cache).nodes
+            with self.assertLogs('prediction_worker', 'INFO') as logs:
+                centrality = katz_centrality(graph, cache, alpha=0.9, max_iter=50)
+            self.assertIn('did not converge', logs.output[-1])
+            np.testing.assert_allclose(
+                centrality, _expected(nx.katz_centrality_numpy(graph, alpha=0.9), nodes), atol=1e-8
+            )
+
+    def test_cached(self):
+        graph = next(_graphs())
+        cache = GraphCache()
+        self.assertIs(katz_centrality(graph, cache), katz_centrality(graph, cache))
+
+
+if __name__ == '__main__':
+    unittest.main()
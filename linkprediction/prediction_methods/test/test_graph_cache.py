@@ -0,0 +1,96 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+import gc
+import unittest
+import weakref
+from unittest import mock
+
+import networkx as nx
+import numpy as np
+
+from linkprediction.prediction_methods.prediction.adjacency import get_adjacency
+from linkprediction.prediction_methods.prediction.graph_cache import GraphCache
+from linkprediction.prediction_methods.prediction.neighborhood import PairNeighborhood
+from linkprediction.prediction_methods.prediction.similarity_indices import (
+    AdamicAdar, CommonNeighbors, Jaccard, Salton)
+from linkprediction.prediction_methods.prediction.utility import (
+    allocate_feature_matrix, fill_prediction, fill_predictions)
+from linkprediction.prediction_methods.preparation.candidates import (
+    CandidatePairs, find_missing_edges)
+
+
+class TestGraphCache(unittest.TestCase):
+    """GraphCache tokens do not keep objects or entries alive, and chunk
+    statistics are shared between predictors"""
+
+    def test_entries_are_released_with_their_object(self):
+        cache = GraphCache()
+        graph = nx.path_graph(10)
+        adjacency = get_adjacency(graph, cache)
+        self.assertIs(get_adjacency(graph, cache), adjacency)
+        self.assertGreater(cache.nbytes, 0)
+
+        del graph
+        gc.collect()
+        self.assertEqual(cache.nbytes, 0)
+        self.assertEqual(len(cache._tokens), 0)
+        self.assertEqual(len(cache._token_keys), 0)
+
+    def test_objects_without_weak_references_are_not_pinned(self):
+        cache = GraphCache()
+        pairs = [(0, 1), (1, 2)]
+        token = cache.token(pairs)
+        self.assertNotEqual(cache.token(pairs), token)
+        cache.get(('pairs', token), lambda: np.zeros(100))
+        self.assertEqual(cache.nbytes, 0)
+        self.assertEqual(len(cache._tokens), 0)
+
+    def test_byte_budget(self):
+        cache = GraphCache(max_bytes=1000)
+        for index in range(10):
+            cache.get(('array', index), lambda: np.zeros(50))
+        self.assertLessEqual(cache.nbytes, 1000)
+        self.assertGreater(cache.evictions, 0)
+
+    def test_chunk_statistics_are_shared(self):
+        cache = GraphCache()
+        graph = nx.gnp_random_graph(80, 0.1, seed=3)
+        candidates = CandidatePairs(list(graph), *find_missing_edges(graph))
+        predictors = [CommonNeighbors(graph, cache=cache), Jaccard(graph, cache=cache),
+                      Salton(graph, cache=cache), AdamicAdar(graph, cache=cache)]
+        get_adjacency(graph, cache)
+        graph_nbytes = cache.nbytes
+        hits, misses = cache.hits, cache.misses
+
+        reduce_rows = PairNeighborhood._reduce_rows
+        statistics = []
+
+        def counting_reduce_rows(neighborhood, node_weights):
+            result = reduce_rows(neighborhood, node_weights)
+            # The statistics of the previous chunks have been released
+            self.assertTrue(all(reference() is None for reference, chunk in statistics
+                                if chunk != neighborhood.key))
+            statistics.append((weakref.ref(result), neighborhood.key))
+            return result
+
+        features = allocate_feature_matrix(candidates, predictors)
+        with mock.patch.object(PairNeighborhood, '_reduce_rows', counting_reduce_rows):
+            fill_predictions(features, candidates, predictors, chunk_size=100)
+        chunks = -(-len(candidates) // 100)
+        # One plain and one weighted intersection per chunk for all predictors
+        self.assertEqual(len(statistics), 2 * chunks)
+        self.assertEqual(len({chunk for _, chunk in statistics}), chunks)
+        self.assertTrue(all(reference() is None for reference, _ in statistics))
+        self.assertEqual(cache.nbytes, graph_nbytes)
+        # The requests of the chunk caches are counted by the run cache
+        self.assertEqual(cache.misses - misses, 2 * chunks)
+        self.assertGreaterEqual(cache.hits - hits, 2 * chunks)
+
+        for column, predictor in enumerate(predictors):
+            expected = np.empty(len(candidates))
+            fill_prediction(expected, candidates, predictor)
+            np.testing.assert_allclose(features[:, column], expected, rtol=1e-6)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+import unittest
+
+import networkx as nx
+import numpy as np
+
+from linkprediction.prediction_methods.prediction.graph_cache import GraphCache
+from linkprediction.prediction_methods.prediction.parallel import fill_predictions_parallel
+from linkprediction.prediction_methods.prediction.similarity_indices import (
+    AdamicAdar, AdjustedRand, Jaccard, PreferentialAttachement,
+    ResourceAllocation, SameCommunity, ShortestPath)
+from linkprediction.prediction_methods.prediction.utility import (
+    allocate_feature_matrix, fill_prediction, fill_predictions)
+from linkprediction.prediction_methods.preparation.candidates import (
+    CandidatePairs, find_missing_edges)
+
+
+def _predictors(graph, cache):
+    return [
+        AdamicAdar(graph, cache=cache),
+        AdjustedRand(graph, backend='numba', cache=cache),
+        Jaccard(graph, cache=cache),
+        PreferentialAttachement(graph, cache=cache),
+        ResourceAllocation(graph, backend='numba', cache=cache),
+        SameCommunity(graph, community_detection='label_propagation', cache=cache),
+        ShortestPath(graph, cache=cache),
+        # Needs the networkx graph, so it is scored in the calling process
+        ShortestPath(graph, method='dijkstra', cache=cache)
+    ]
+
+
+class TestFillPredictionsParallel(unittest.TestCase):
+    """fill_predictions and fill_predictions_parallel equal the sequential
+    fill_prediction"""
+
+    def _assert_parallel_equals_sequential(self, graph):
+        candidates = CandidatePairs(list(graph), *find_missing_edges(graph))
+        cache = GraphCache()
+        predictors = _predictors(graph, cache)
+
+        sequential = allocate_feature_matrix(candidates, predictors)
+        for column, predictor in enumerate(predictors):
+            fill_prediction(sequential[:, column], candidates, predictor, chunk_size=97)
+        chunked = allocate_feature_matrix(candidates, predictors)
+        chunked_progress = []
+        fill_predictions(chunked, candidates, predictors, chunk_size=97,
+                         progress=chunked_progress.append)
+        parallel = allocate_feature_matrix(candidates, predictors)
+        parallel_progress = []
+        fill_predictions_parallel(parallel, candidates, predictors, 2, chunk_size=97,
+                                  progress=parallel_progress.append)
+
+        self.assertTrue(np.array_equal(sequential, chunked))
+        self.assertTrue(np.array_equal(sequential, parallel))
+        # Progress is reported per chunk and adds up to all scores
+        for progress in (chunked_progress, parallel_progress):
+            self.assertGreater(len(progress), len(predictors))
+            self.assertEqual(sum(progress), len(candidates) * len(predictors))
+
+    def test_undirected(self):
+        graph = nx.gnp_random_graph(60, 0.08, seed=1)
+        graph.add_edge(3, 3)
+        self._assert_parallel_equals_sequential(graph)
+
+    def test_directed(self):
+        graph = nx.gnp_random_graph(60, 0.06, seed=2, directed=True)
+        graph.add_edge(5, 5)
+        self._assert_parallel_equals_sequential(graph)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+import math
+import unittest
+
+import networkx as nx
+import numpy as np
+
+from linkprediction.prediction_methods.predictor_factory import LinkPredictorFactory
+from linkprediction.prediction_methods.preparation.candidates import (
+    CandidatePairs, find_missing_edges)
+
+
+def _common(graph, u, v):
+    return len(list(nx.common_neighbors(graph, u, v)))
+
+
+def _union(graph, u, v):
+    return len(set(graph.neighbors(u)) | set(graph.neighbors(v)))
+
+
+def _ratio(numerator, denominator):
+    return numerator / denominator if denominator != 0 else 0
+
+
+def _adjusted_rand(graph, u, v):
+    a, b = _common(graph, u, v), _union(graph, u, v)
+    c, d = b, len(graph) - b
+    return _ratio(2 * (a * d - b * c), ((a + b) * (b + d)) + ((a + c) * (c + d)))
+
+
+def _same_community(graph, u, v, _labels={}):
+    if graph not in _labels:
+        communities = next(nx.community.girvan_newman(graph))
+        _labels[graph] = {node: label for label, nodes in enumerate(communities)
+                          for node in nodes}
+    labels = _labels[graph]
+    return int(labels.get(u, -1) == labels.get(v, -2))
+
+
+def _shortest_path(graph, u, v):
+    try:
+        return nx.shortest_path_length(graph, u, v)
+    except nx.NetworkXNoPath:
+        return -1
+
+
+# Scores of the original networkx implementations on the undirected graph
+REFERENCES = {
+    'AdamicAdar': lambda graph, u, v: next(nx.adamic_adar_index(graph, [(u, v)]))[2],
+    'AdjustedRand': _adjusted_rand,
+    'CommonNeighbors': _common,
+    'Jaccard': lambda graph, u, v: next(nx.jaccard_coefficient(graph, [(u, v)]))[2],
+    'Salton': lambda graph, u, v: _ratio(
+        _common(graph, u, v), math.sqrt(graph.degree(u) * graph.degree(v))),
+    'PreferentialAttachement': lambda graph, u, v: graph.degree(u) * graph.degree(v),
+    'ResourceAllocation': lambda graph, u, v: next(nx.resource_allocation_index(graph, [(u, v)]))[2],
+    'SameCommunity': _same_community,
+    'ShortestPath': _shortest_path,
+    'TotalNeighbors': _union,
+    'UDegree': lambda graph, u, v: graph.degree(u),
+    'VDegree': lambda graph, u, v: graph.degree(v),
+    'Sorensen': lambda graph, u, v: _ratio(
+        2 * _common(graph, u, v), graph.degree(u) + graph.degree(v)),
+    'HubPromoted': lambda graph, u, v: _ratio(
+        2 * _common(graph, u, v), min(graph.degree(u), graph.degree(v))),
+    'HubDepressed': lambda graph, u, v: _ratio(
+        2 * _common(graph, u, v), max(graph.degree(u), graph.degree(v))),
+    'LeichtHolmeNewman': lambda graph, u, v: _ratio(
+        2 * _common(graph, u, v), graph.degree(u) * graph.degree(v)),
+}
+
+
+class TestSimilarityIndices(unittest.TestCase):
+    """Topology predictors equal the original networkx implementations"""
+
+    def _assert_equal_to_references(self, graph):
+        undirected_graph = graph.to_undirected()
+        candidates = CandidatePairs(list(graph), *find_missing_edges(graph))
+        for backend in ('scipy', 'numba'):
+            factory = LinkPredictorFactory()
+            for name, reference in REFERENCES.items():
+                predictor = factory.create(
+                    {'designation': name, 'feature_type': 'Topology',
+                     'parameters': {'backend': backend}},
+                    graph=graph
+                )
+                scores = np.concatenate(list(predictor.predict_chunks(candidates, 50)))
+                expected = [reference(undirected_graph, u, v) for u, v in candidates]
+                np.testing.assert_allclose(scores, expected, rtol=1e-12, atol=0,
+                                           err_msg=f'{name} ({backend})')
+
+    def test_undirected(self):
+        graph = nx.gnp_random_graph(30, 0.15, seed=4)
+        graph.add_edges_from([(2, 2), (7, 7)])
+        graph.add_node('isolated')
+        self._assert_equal_to_references(graph)
+
+    def test_directed(self):
+        graph = nx.gnp_random_graph(30, 0.1, seed=5, directed=True)
+        graph.add_edges_from([(2, 2), (7, 7)])
+        graph.add_node('isolated')
+        self._assert_equal_to_references(graph)
+
+
+if __name__ == '__main__':
+    unittest.main()
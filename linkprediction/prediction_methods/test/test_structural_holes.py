@@ -0,0 +1,65 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+import unittest
+
+import networkx as nx
+import numpy as np
+
+from linkprediction.prediction_methods.prediction.adjacency import get_adjacency
+from linkprediction.prediction_methods.prediction.graph_cache import GraphCache
+from linkprediction.prediction_methods.prediction.structural_holes import (
+    burt_constraint, constraint_with_edges)
+
+
+def _graphs():
+    for seed, directed in ((1, True), (2, False), (3, True)):
+        graph = nx.gnm_random_graph(25, 60, seed=seed, directed=directed)
+        graph.add_edges_from([(4, 4), (9, 9)])
+        graph.add_node('isolated')
+        yield graph
+
+
+class TestBurtConstraint(unittest.TestCase):
+    """burt_constraint equals networkx.constraint"""
+
+    def test_all_nodes(self):
+        for graph in _graphs():
+            cache = GraphCache()
+            constraints = burt_constraint(graph, cache)
+            expected = nx.constraint(graph)
+            np.testing.assert_allclose(
+                constraints,
+                [expected[node] for node in get_adjacency(graph, cache).nodes],
+                rtol=1e-12, atol=1e-15
+            )
+
+
+class TestConstraintWithEdges(unittest.TestCase):
+    """constraint_with_edges equals networkx.constraint after adding the edge"""
+
+    def test_hypothetical_edges(self):
+        for graph in _graphs():
+            for node in (0, 4, 'isolated'):
+                counterparts = [other for other in graph if other != node]
+                constraints = constraint_with_edges(graph, node, counterparts, GraphCache())
+
+                expected = []
+                for counterpart in counterparts:
+                    if graph.has_edge(node, counterpart):
+                        expected.append(np.nan)
+                        continue
+                    graph.add_edge(node, counterpart)
+                    expected.append(nx.constraint(graph, [node])[node])
+                    graph.remove_edge(node, counterpart)
+                np.testing.assert_allclose(constraints, expected, rtol=1e-12, atol=1e-15)
+
+    def test_graph_is_unchanged(self):
+        graph = next(_graphs())
+        edges = set(graph.edges())
+        constraint_with_edges(graph, 0, [1, 2, 3])
+        self.assertEqual(set(graph.edges()), edges)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+# coding: utf-8
+
+from __future__ import absolute_import
+import unittest
+
+import networkx as nx
+import numpy as np
+
+from linkprediction.prediction_methods.prediction import triads
+
+
+def _graphs():
+    for seed in range(4):
+        graph = nx.gnp_random_graph(16, 0.15 + 0.1 * seed, seed=seed, directed=True)
+        graph.add_edges_from([(1, 1), (5, 5)])
+        # Non-sortable positions: nodes are not added in their sort order
+        relabelled = nx.DiGraph()
+        relabelled.add_nodes_from(sorted(graph, key=lambda node: (node * 7) % 16))
+        relabelled.add_edges_from(graph.edges())
+        yield relabelled
+
+
+class TestTriadicEnumeration(unittest.TestCase):
+    """Triad enumeration matches networkx.triadic_census"""
+
+    def test_census(self):
+        for graph in _graphs():
+            enumeration = triads.triadic_enumeration(graph, set(triads.TRIAD_NAMES))
+            census = nx.triadic_census(graph)
+            self.assertEqual({name: len(found) for name, found in enumeration.items()}, census)
+
+    def test_triad_types(self):
+        for graph in _graphs():
+            enumeration = triads.triadic_enumeration(graph, set(triads.TRIAD_NAMES))
+            for name, found in enumeration.items():
+                for triad in found:
+                    code = triads._tricode(graph, *triad)
+                    self.assertEqual(triads.TRICODE_TO_NAME[code], name)
+
+    def test_iter_triads(self):
+        for graph in _graphs():
+            n = len(graph)
+            chunks = list(triads.iter_triads(graph, chunk_size=10))
+            self.assertGreater(len(chunks), 1)
+            codes, u, v, w = (np.concatenate(arrays) for arrays in zip(*chunks))
+            self.assertTrue(((u < v) & (v < w)).all())
+            self.assertEqual(len({(a, b, c) for a, b, c in zip(u, v, w)}),
+                             n * (n - 1) * (n - 2) // 6)
+
+            nodes = list(graph)
+            for code, a, b, c in zip(codes, u, v, w):
+                self.assertEqual(triads._tricode(graph, nodes[a], nodes[b], nodes[c]), code)
+
+    def test_requested_types_only(self):
+        for graph in _graphs():
+            requested = {'021C', '030C', '201'}
+            for codes, _, _, _ in triads.iter_triads(graph, requested):
+                self.assertTrue({triads.TRICODE_TO_NAME[code] for code in codes.tolist()} <= requested)
+
+    def test_invalid_type(self):
+        graph = next(_graphs())
+        self.assertIsNone(triads.triadic_enumeration(graph, {'021C', '999'}))
+        with self.assertRaises(ValueError):
+            list(triads.iter_triads(graph, {'999'}))
+
+
+class TestClosingEdges(unittest.TestCase):
+    """The closing edge table matches get_missing_edges_for_bt"""
+
+    def test_closing_edges_table(self):
+        for code in range(64):
+            subgraph = nx.DiGraph()
+            subgraph.add_nodes_from(range(3))
+            subgraph.add_edges_from(dyad for bit, dyad in enumerate(triads.TRIAD_DYADS)
+                                    if code & (1 << bit))
+            expected = set(triads.get_missing_edges_for_bt(subgraph))
+            closing = {dyad for dyad, closes in zip(triads.TRIAD_DYADS, triads.CLOSING_EDGES[code])
+                       if closes}
+            self.assertEqual(closing, expected, code)
+
+    def test_get_closing_edges(self):
+        for graph in _graphs():
+            nodes = list(graph)
+            for codes, u, v, w in triads.iter_triads(graph, chunk_size=50):
+                triad_index, sources, targets = triads.get_closing_edges(codes, u, v, w)
+                self.assertTrue((np.diff(triad_index) >= 0).all())
+                closing = {(index, nodes[source], nodes[target]) for index, source, target
+                           in zip(triad_index.tolist(), sources.tolist(), targets.tolist())}
+                expected = set()
+                for index, triad in enumerate(zip(u.tolist(), v.tolist(), w.tolist())):
+                    subgraph = graph.subgraph(nodes[position] for position in triad)
+                    expected.update((index, source, target) for source, target
+                                    in triads.get_missing_edges_for_bt(subgraph))
+                self.assertEqual(closing, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()